@@ -12,33 +12,75 @@ import yfinance as yf
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from scipy import stats
 import math
 
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj):
+    """Serialize NumPy arrays/scalars for the stdlib json fallback"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Encode a response body as JSON bytes (orjson handles NumPy natively)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+# Standard normal CDF tabulated on a dense grid; Greeks are only reported to
+# 4-6 decimals, so linear interpolation is well inside display precision.
+# SciPy is imported lazily (here and in the pairs code) so actions that never
+# touch it skip the import on cold start.
+_D_GRID = np.linspace(-8, 8, 8192)
+_CDF_LUT = None
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
+
+def fast_cdf(x):
+    """Standard normal CDF via table lookup"""
+    global _CDF_LUT
+    if _CDF_LUT is None:
+        from scipy.special import ndtr
+        _CDF_LUT = ndtr(_D_GRID)
+    return float(np.interp(x, _D_GRID, _CDF_LUT))
+
+
 def calculate_greeks(S, K, T, r, sigma, option_type='call'):
     """Calculate option Greeks using Black-Scholes"""
-    from scipy.stats import norm
-
     if T <= 0 or sigma <= 0:
         return {'delta': 0, 'gamma': 0, 'theta': 0, 'vega': 0, 'rho': 0}
 
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
+    sqrt_T = math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    pdf_d1 = _INV_SQRT_2PI * math.exp(-0.5 * d1 * d1)
+    discount = math.exp(-r * T)
 
     if option_type == 'call':
-        delta = norm.cdf(d1)
-        theta = (-S * norm.pdf(d1) * sigma / (2 * np.sqrt(T))
-                 - r * K * np.exp(-r * T) * norm.cdf(d2)) / 365
-        rho = K * T * np.exp(-r * T) * norm.cdf(d2) / 100
+        cdf_d2 = fast_cdf(d2)
+        delta = fast_cdf(d1)
+        theta = (-S * pdf_d1 * sigma / (2 * sqrt_T)
+                 - r * K * discount * cdf_d2) / 365
+        rho = K * T * discount * cdf_d2 / 100
     else:
-        delta = norm.cdf(d1) - 1
-        theta = (-S * norm.pdf(d1) * sigma / (2 * np.sqrt(T))
-                 + r * K * np.exp(-r * T) * norm.cdf(-d2)) / 365
-        rho = -K * T * np.exp(-r * T) * norm.cdf(-d2) / 100
+        cdf_neg_d2 = fast_cdf(-d2)
+        delta = fast_cdf(d1) - 1
+        theta = (-S * pdf_d1 * sigma / (2 * sqrt_T)
+                 + r * K * discount * cdf_neg_d2) / 365
+        rho = -K * T * discount * cdf_neg_d2 / 100
 
-    gamma = norm.pdf(d1) / (S * sigma * np.sqrt(T))
-    vega = S * norm.pdf(d1) * np.sqrt(T) / 100
+    gamma = pdf_d1 / (S * sigma * sqrt_T)
+    vega = S * pdf_d1 * sqrt_T / 100
 
     return {
         'delta': round(delta, 4),
@@ -49,6 +91,47 @@ def calculate_greeks(S, K, T, r, sigma, option_type='call'):
     }
 
 
+# Defaults for missing option chain fields (0.3 is the fallback implied vol)
+OPTION_FILL_DEFAULTS = {
+    'bid': 0, 'ask': 0, 'lastPrice': 0, 'volume': 0, 'openInterest': 0,
+    'impliedVolatility': 0.3
+}
+
+
+def build_option_rows(frame, S, T, r, option_type='call'):
+    """Convert one side of an option chain into response rows with Greeks"""
+    # Fill missing quotes in one pass, then materialize columns once instead
+    # of boxing every row into a Series
+    frame = frame.fillna(OPTION_FILL_DEFAULTS).astype({'volume': 'int64', 'openInterest': 'int64'})
+    strikes = frame['strike'].to_numpy(dtype=float)
+    bids = frame['bid'].to_numpy()
+    asks = frame['ask'].to_numpy()
+    lasts = frame['lastPrice'].to_numpy()
+    volumes = frame['volume'].to_numpy()
+    open_interest = frame['openInterest'].to_numpy()
+    ivs = frame['impliedVolatility'].to_numpy()
+
+    rows = []
+    for i in range(len(strikes)):
+        strike = float(strikes[i])
+        iv = float(ivs[i])
+
+        greeks = calculate_greeks(S, strike, T, r, iv, option_type)
+
+        rows.append({
+            'strike': strike,
+            'bid': float(bids[i]),
+            'ask': float(asks[i]),
+            'last': float(lasts[i]),
+            'volume': int(volumes[i]),
+            'openInterest': int(open_interest[i]),
+            'iv': round(iv * 100, 2),  # As percentage
+            **greeks
+        })
+
+    return rows
+
+
 def get_options_chain(ticker: str):
     """Fetch options chain data for a ticker"""
     try:
@@ -68,6 +151,7 @@ def get_options_chain(ticker: str):
 
         # Get options for the nearest 3 expiration dates
         chains = []
+        surface_parts = []
         risk_free_rate = 0.05  # Approximate risk-free rate
 
         for exp_date in expirations[:3]:
@@ -79,43 +163,9 @@ def get_options_chain(ticker: str):
                 days_to_exp = (exp_datetime - datetime.now()).days
                 T = max(days_to_exp / 365, 0.001)  # Time in years
 
-                # Process calls
-                calls_data = []
-                for _, row in opt.calls.iterrows():
-                    strike = float(row['strike'])
-                    iv = float(row['impliedVolatility']) if pd.notna(row['impliedVolatility']) else 0.3
-
-                    greeks = calculate_greeks(current_price, strike, T, risk_free_rate, iv, 'call')
-
-                    calls_data.append({
-                        'strike': strike,
-                        'bid': float(row['bid']) if pd.notna(row['bid']) else 0,
-                        'ask': float(row['ask']) if pd.notna(row['ask']) else 0,
-                        'last': float(row['lastPrice']) if pd.notna(row['lastPrice']) else 0,
-                        'volume': int(row['volume']) if pd.notna(row['volume']) else 0,
-                        'openInterest': int(row['openInterest']) if pd.notna(row['openInterest']) else 0,
-                        'iv': round(iv * 100, 2),  # As percentage
-                        **greeks
-                    })
-
-                # Process puts
-                puts_data = []
-                for _, row in opt.puts.iterrows():
-                    strike = float(row['strike'])
-                    iv = float(row['impliedVolatility']) if pd.notna(row['impliedVolatility']) else 0.3
-
-                    greeks = calculate_greeks(current_price, strike, T, risk_free_rate, iv, 'put')
-
-                    puts_data.append({
-                        'strike': strike,
-                        'bid': float(row['bid']) if pd.notna(row['bid']) else 0,
-                        'ask': float(row['ask']) if pd.notna(row['ask']) else 0,
-                        'last': float(row['lastPrice']) if pd.notna(row['lastPrice']) else 0,
-                        'volume': int(row['volume']) if pd.notna(row['volume']) else 0,
-                        'openInterest': int(row['openInterest']) if pd.notna(row['openInterest']) else 0,
-                        'iv': round(iv * 100, 2),
-                        **greeks
-                    })
+                # Process calls and puts
+                calls_data = build_option_rows(opt.calls, current_price, T, risk_free_rate, 'call')
+                puts_data = build_option_rows(opt.puts, current_price, T, risk_free_rate, 'put')
 
                 chains.append({
                     'expiration': exp_date,
@@ -124,6 +174,15 @@ def get_options_chain(ticker: str):
                     'puts': puts_data
                 })
 
+                # Keep IV surface columns as arrays; rows are built once at the end
+                for option_type, frame in (('call', opt.calls), ('put', opt.puts)):
+                    surface_parts.append(pd.DataFrame({
+                        'strike': frame['strike'].astype(float).to_numpy(),
+                        'expiration': days_to_exp,
+                        'iv': (frame['impliedVolatility'].fillna(OPTION_FILL_DEFAULTS['impliedVolatility']) * 100).round(2).to_numpy(),
+                        'type': option_type
+                    }))
+
             except Exception as e:
                 continue
 
@@ -131,24 +190,8 @@ def get_options_chain(ticker: str):
             return {'error': 'Could not fetch options data'}
 
         # Calculate IV surface data for visualization
-        iv_surface = []
-        for chain in chains:
-            for call in chain['calls']:
-                if call['iv'] > 0:
-                    iv_surface.append({
-                        'strike': call['strike'],
-                        'expiration': chain['daysToExpiration'],
-                        'iv': call['iv'],
-                        'type': 'call'
-                    })
-            for put in chain['puts']:
-                if put['iv'] > 0:
-                    iv_surface.append({
-                        'strike': put['strike'],
-                        'expiration': chain['daysToExpiration'],
-                        'iv': put['iv'],
-                        'type': 'put'
-                    })
+        surface = pd.concat(surface_parts, ignore_index=True)
+        iv_surface = surface[surface['iv'] > 0].to_dict('records')
 
         return {
             'ticker': ticker,
@@ -178,8 +221,9 @@ def calculate_technical_indicators(ticker: str, period: str = '6mo'):
         low = df['Low']
         volume = df['Volume']
 
-        # Moving Averages
-        df['SMA_20'] = close.rolling(window=20).mean()
+        # Moving Averages (20-day window shared with Bollinger Bands)
+        roll_20 = close.rolling(window=20)
+        df['SMA_20'] = roll_20.mean()
         df['SMA_50'] = close.rolling(window=50).mean()
         df['SMA_200'] = close.rolling(window=200).mean() if len(df) >= 200 else None
         df['EMA_12'] = close.ewm(span=12, adjust=False).mean()
@@ -198,8 +242,8 @@ def calculate_technical_indicators(ticker: str, period: str = '6mo'):
         df['MACD_Histogram'] = df['MACD'] - df['MACD_Signal']
 
         # Bollinger Bands
-        df['BB_Middle'] = close.rolling(window=20).mean()
-        bb_std = close.rolling(window=20).std()
+        df['BB_Middle'] = df['SMA_20']
+        bb_std = roll_20.std()
         df['BB_Upper'] = df['BB_Middle'] + (bb_std * 2)
         df['BB_Lower'] = df['BB_Middle'] - (bb_std * 2)
         df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle'] * 100
@@ -211,11 +255,13 @@ def calculate_technical_indicators(ticker: str, period: str = '6mo'):
         df['Stoch_D'] = df['Stoch_K'].rolling(window=3).mean()
 
         # Average True Range (ATR)
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        df['ATR'] = tr.rolling(window=14).mean()
+        prev_close = close.shift().to_numpy()
+        tr1 = (high - low).to_numpy()
+        tr2 = np.abs(high.to_numpy() - prev_close)
+        tr3 = np.abs(low.to_numpy() - prev_close)
+        # fmax skips the NaN previous close on the first bar, like DataFrame.max
+        tr = np.fmax(np.fmax(tr1, tr2), tr3)
+        df['ATR'] = pd.Series(tr, index=df.index).rolling(window=14).mean()
 
         # Volume indicators
         df['Volume_SMA'] = volume.rolling(window=20).mean()
@@ -271,27 +317,27 @@ def calculate_technical_indicators(ticker: str, period: str = '6mo'):
         chart_data = {
             'dates': chart_df['Date'].tolist(),
             'ohlc': {
-                'open': chart_df['Open'].round(2).tolist(),
-                'high': chart_df['High'].round(2).tolist(),
-                'low': chart_df['Low'].round(2).tolist(),
-                'close': chart_df['Close'].round(2).tolist()
+                'open': chart_df['Open'].round(2).to_numpy(),
+                'high': chart_df['High'].round(2).to_numpy(),
+                'low': chart_df['Low'].round(2).to_numpy(),
+                'close': chart_df['Close'].round(2).to_numpy()
             },
-            'volume': chart_df['Volume'].tolist(),
+            'volume': chart_df['Volume'].to_numpy(),
             'indicators': {
-                'sma20': chart_df['SMA_20'].round(2).tolist(),
-                'sma50': chart_df['SMA_50'].round(2).tolist(),
-                'ema12': chart_df['EMA_12'].round(2).tolist(),
-                'ema26': chart_df['EMA_26'].round(2).tolist(),
-                'rsi': chart_df['RSI'].round(2).tolist(),
-                'macd': chart_df['MACD'].round(4).tolist(),
-                'macdSignal': chart_df['MACD_Signal'].round(4).tolist(),
-                'macdHistogram': chart_df['MACD_Histogram'].round(4).tolist(),
-                'bbUpper': chart_df['BB_Upper'].round(2).tolist(),
-                'bbMiddle': chart_df['BB_Middle'].round(2).tolist(),
-                'bbLower': chart_df['BB_Lower'].round(2).tolist(),
-                'stochK': chart_df['Stoch_K'].round(2).tolist(),
-                'stochD': chart_df['Stoch_D'].round(2).tolist(),
-                'atr': chart_df['ATR'].round(2).tolist(),
+                'sma20': chart_df['SMA_20'].round(2).to_numpy(),
+                'sma50': chart_df['SMA_50'].round(2).to_numpy(),
+                'ema12': chart_df['EMA_12'].round(2).to_numpy(),
+                'ema26': chart_df['EMA_26'].round(2).to_numpy(),
+                'rsi': chart_df['RSI'].round(2).to_numpy(),
+                'macd': chart_df['MACD'].round(4).to_numpy(),
+                'macdSignal': chart_df['MACD_Signal'].round(4).to_numpy(),
+                'macdHistogram': chart_df['MACD_Histogram'].round(4).to_numpy(),
+                'bbUpper': chart_df['BB_Upper'].round(2).to_numpy(),
+                'bbMiddle': chart_df['BB_Middle'].round(2).to_numpy(),
+                'bbLower': chart_df['BB_Lower'].round(2).to_numpy(),
+                'stochK': chart_df['Stoch_K'].round(2).to_numpy(),
+                'stochD': chart_df['Stoch_D'].round(2).to_numpy(),
+                'atr': chart_df['ATR'].round(2).to_numpy(),
             }
         }
 
@@ -341,14 +387,15 @@ def adf_test(series):
     # Add constant and trend
     X = np.column_stack([np.ones(n-1), y_lag])
 
-    # OLS regression
-    XtX_inv = np.linalg.inv(X.T @ X)
-    beta = XtX_inv @ X.T @ dy
+    # OLS regression via the normal equations (solve, no explicit inverse)
+    XtX = X.T @ X
+    beta = np.linalg.solve(XtX, X.T @ dy)
     residuals = dy - X @ beta
-    sigma2 = np.sum(residuals**2) / (n - 3)
+    sigma2 = (residuals @ residuals) / (n - 3)
 
-    # t-statistic for y_lag coefficient
-    se = np.sqrt(sigma2 * XtX_inv[1, 1])
+    # t-statistic for y_lag coefficient; (X'X)^-1[1, 1] from the 2x2 closed form
+    XtX_inv_11 = XtX[0, 0] / (XtX[0, 0] * XtX[1, 1] - XtX[0, 1] ** 2)
+    se = np.sqrt(sigma2 * XtX_inv_11)
     t_stat = beta[1] / se
 
     # Approximate p-value (simplified)
@@ -366,7 +413,9 @@ def adf_test(series):
 
 def calculate_hedge_ratio(series1, series2):
     """Calculate optimal hedge ratio using OLS"""
-    slope, intercept, r_value, p_value, std_err = stats.linregress(series2, series1)
+    from scipy.stats import linregress
+
+    slope, intercept, r_value, p_value, std_err = linregress(series2, series1)
     return float(slope), float(intercept), float(r_value**2)
 
 
@@ -388,33 +437,24 @@ def calculate_zscore(spread, lookback=20):
 
 def generate_signals(zscore, entry_threshold=2.0, exit_threshold=0.5):
     """Generate trading signals based on z-score"""
-    signals = []
+    signals = np.empty(len(zscore), dtype=np.int8)
     position = 0  # 0 = flat, 1 = long spread, -1 = short spread
 
-    for z in zscore:
+    for i, z in enumerate(zscore):
         if position == 0:
             if z < -entry_threshold:
                 position = 1  # Long spread (buy series1, sell series2)
-                signals.append(1)
             elif z > entry_threshold:
                 position = -1  # Short spread (sell series1, buy series2)
-                signals.append(-1)
-            else:
-                signals.append(0)
         elif position == 1:
             if z > -exit_threshold:
                 position = 0  # Exit long
-                signals.append(0)
-            else:
-                signals.append(1)
         elif position == -1:
             if z < exit_threshold:
                 position = 0  # Exit short
-                signals.append(0)
-            else:
-                signals.append(-1)
+        signals[i] = position
 
-    return signals
+    return signals.tolist()
 
 
 def backtest_strategy(prices1, prices2, signals, hedge_ratio):
@@ -905,7 +945,7 @@ class handler(BaseHTTPRequestHandler):
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(result, default=str).encode())
+        self.wfile.write(dumps(result))
         return
 
     def do_OPTIONS(self):
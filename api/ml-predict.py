@@ -5,6 +5,9 @@ Uses numpy-only implementations to avoid scikit-learn dependency
 from http.server import BaseHTTPRequestHandler
 import json
 from urllib.parse import parse_qs, urlparse
+from functools import lru_cache
+import time
+import warnings
 
 try:
     import numpy as np
@@ -20,31 +23,127 @@ except ImportError:
     YFINANCE_AVAILABLE = False
 
 
-def calculate_rsi(prices, period=14):
-    """Calculate Relative Strength Index"""
-    deltas = np.diff(prices)
-    gains = np.where(deltas > 0, deltas, 0)
-    losses = np.where(deltas < 0, -deltas, 0)
+try:
+    from scipy.linalg import solve as la_solve
+    from scipy.linalg.blas import dsyrk
+    from scipy.signal import lfilter
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj):
+    """Serialize NumPy arrays/scalars for the stdlib json fallback"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Encode a response body as JSON bytes (orjson handles NumPy natively)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+OPTIMIZED_BLAS = ('openblas', 'mkl', 'accelerate', 'blis')
+
+
+def blas_vendor():
+    """Name of the BLAS NumPy was built against, or '' if it cannot be determined"""
+    try:
+        return np.show_config(mode='dicts')['Build Dependencies']['blas']['name']
+    except Exception:
+        return ''
+
+
+# The ridge fit and predictions go straight to BLAS; a reference BLAS build
+# is an order of magnitude slower, so make it visible in the function logs
+if NUMPY_AVAILABLE:
+    BLAS_VENDOR = blas_vendor()
+    if not any(name in BLAS_VENDOR.lower() for name in OPTIMIZED_BLAS):
+        warnings.warn(f"NumPy is not linked against an optimized BLAS ({BLAS_VENDOR or 'unknown'})")
+
+
+HISTORY_TTL_SECONDS = 300
+
 
-    avg_gain = np.zeros(len(prices))
-    avg_loss = np.zeros(len(prices))
+@lru_cache(maxsize=128)
+def _history_for_bucket(ticker, period, bucket):
+    """Download price history; bucket changes every HISTORY_TTL_SECONDS"""
+    return yf.Ticker(ticker).history(period=period)
 
-    if period < len(gains):
-        avg_gain[period] = np.mean(gains[:period])
-        avg_loss[period] = np.mean(losses[:period])
 
-        for i in range(period + 1, len(prices)):
-            avg_gain[i] = (avg_gain[i-1] * (period - 1) + gains[i-1]) / period
-            avg_loss[i] = (avg_loss[i-1] * (period - 1) + losses[i-1]) / period
+def fetch_history(ticker, period):
+    """Price history memoized per warm instance (callers must not mutate it)"""
+    return _history_for_bucket(ticker, period, int(time.time() // HISTORY_TTL_SECONDS))
 
-    rs = np.where(avg_loss != 0, avg_gain / avg_loss, 0)
-    rsi = 100 - (100 / (1 + rs))
+
+def _rsi_core(prices, period):
+    """Wilder-smoothed RSI recurrence over a plain list of prices"""
+    n = len(prices)
+    rsi = [0.0] * n  # RS defaults to 0 (RSI 0) where there is no average loss
+
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        d = prices[i] - prices[i-1]
+        if d > 0:
+            avg_gain += d
+        else:
+            avg_loss -= d
+    avg_gain /= period
+    avg_loss /= period
+    if avg_loss != 0:
+        rsi[period] = 100 - 100 / (1 + avg_gain / avg_loss)
+
+    # Gains/losses are derived inside the loop, so no per-delta arrays are built
+    for i in range(period + 1, n):
+        d = prices[i] - prices[i-1]
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+        if avg_loss != 0:
+            rsi[i] = 100 - 100 / (1 + avg_gain / avg_loss)
 
     return rsi
 
 
+def calculate_rsi(prices, period=14):
+    """Calculate Relative Strength Index"""
+    if period >= len(prices) - 1:
+        return np.zeros(len(prices))
+
+    # The recurrence is inherently sequential; running it on Python floats
+    # avoids boxing a NumPy scalar for every element access
+    return np.array(_rsi_core(np.asarray(prices, dtype=float).tolist(), period))
+
+
+def _ema(x, span):
+    """
+    EMA matching pandas ewm(span, adjust=False): y[0] = x[0],
+    y[t] = a*x[t] + (1-a)*y[t-1], run as a first-order IIR filter in C
+    """
+    alpha = 2 / (span + 1)
+    return lfilter([alpha], [1, alpha - 1], x, zi=[(1 - alpha) * x[0]])[0]
+
+
 def calculate_macd(prices, fast=12, slow=26, signal=9):
     """Calculate MACD"""
+    if SCIPY_AVAILABLE:
+        prices = np.asarray(prices, dtype=float)
+        macd_line = _ema(prices, fast) - _ema(prices, slow)
+        return macd_line, _ema(macd_line, signal)
+
     exp_fast = pd.Series(prices).ewm(span=fast, adjust=False).mean()
     exp_slow = pd.Series(prices).ewm(span=slow, adjust=False).mean()
     macd_line = exp_fast - exp_slow
@@ -53,50 +152,72 @@ def calculate_macd(prices, fast=12, slow=26, signal=9):
     return macd_line.values, signal_line.values
 
 
+FEATURE_NAMES = [
+    'return_1d', 'return_5d', 'return_20d',
+    'sma_5', 'sma_20', 'sma_50',
+    'price_sma5_ratio', 'price_sma20_ratio', 'sma5_sma20_ratio',
+    'volatility_5d', 'volatility_20d',
+    'rsi', 'macd', 'macd_signal',
+    'bb_middle', 'bb_upper', 'bb_lower', 'bb_width', 'bb_position',
+    'return_lag_1', 'return_lag_2', 'return_lag_3', 'return_lag_5',
+]
+
+
+def _rolling_windows(x, window):
+    """Strided (n - window + 1, window) view of x; no data is copied"""
+    return np.lib.stride_tricks.sliding_window_view(x, window)
+
+
 def create_features(df):
     """Create technical indicator features"""
-    features = pd.DataFrame(index=df.index)
+    close = df['Close'].to_numpy(dtype=float)
+    n = len(close)
 
-    # Returns
-    features['return_1d'] = df['Close'].pct_change(1)
-    features['return_5d'] = df['Close'].pct_change(5)
-    features['return_20d'] = df['Close'].pct_change(20)
+    # Every feature is written into one preallocated float32 buffer (NaN where
+    # the window is incomplete) and wrapped into a DataFrame once at the end
+    out = np.full((n, len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+    f = dict(zip(FEATURE_NAMES, out.T))
 
-    # Moving averages
-    features['sma_5'] = df['Close'].rolling(5).mean()
-    features['sma_20'] = df['Close'].rolling(20).mean()
-    features['sma_50'] = df['Close'].rolling(50).mean()
+    # Returns
+    for k, name in ((1, 'return_1d'), (5, 'return_5d'), (20, 'return_20d')):
+        if n > k:
+            f[name][k:] = close[k:] / close[:-k] - 1
+    ret = f['return_1d']
+
+    # Moving averages and rolling volatility
+    for w in (5, 20, 50):
+        if n >= w:
+            f[f'sma_{w}'][w-1:] = _rolling_windows(close, w).mean(axis=1)
+    for w in (5, 20):
+        if n >= w:
+            f[f'volatility_{w}d'][w-1:] = _rolling_windows(ret, w).std(axis=1, ddof=1)
 
     # SMA ratios
-    features['price_sma5_ratio'] = df['Close'] / features['sma_5']
-    features['price_sma20_ratio'] = df['Close'] / features['sma_20']
-    features['sma5_sma20_ratio'] = features['sma_5'] / features['sma_20']
-
-    # Volatility
-    features['volatility_5d'] = df['Close'].pct_change().rolling(5).std()
-    features['volatility_20d'] = df['Close'].pct_change().rolling(20).std()
+    f['price_sma5_ratio'][:] = close / f['sma_5']
+    f['price_sma20_ratio'][:] = close / f['sma_20']
+    f['sma5_sma20_ratio'][:] = f['sma_5'] / f['sma_20']
 
-    # RSI
-    features['rsi'] = calculate_rsi(df['Close'].values)
-
-    # MACD
-    macd, macd_signal = calculate_macd(df['Close'].values)
-    features['macd'] = macd
-    features['macd_signal'] = macd_signal
+    # RSI / MACD
+    f['rsi'][:] = calculate_rsi(close)
+    f['macd'][:], f['macd_signal'][:] = calculate_macd(close)
 
     # Bollinger Bands
-    features['bb_middle'] = df['Close'].rolling(20).mean()
-    bb_std = df['Close'].rolling(20).std()
-    features['bb_upper'] = features['bb_middle'] + 2 * bb_std
-    features['bb_lower'] = features['bb_middle'] - 2 * bb_std
-    features['bb_width'] = (features['bb_upper'] - features['bb_lower']) / features['bb_middle']
-    features['bb_position'] = (df['Close'] - features['bb_lower']) / (features['bb_upper'] - features['bb_lower'])
+    f['bb_middle'][:] = f['sma_20']
+    bb_std = np.full(n, np.nan)
+    if n >= 20:
+        bb_std[19:] = _rolling_windows(close, 20).std(axis=1, ddof=1)
+    f['bb_upper'][:] = f['bb_middle'] + 2 * bb_std
+    f['bb_lower'][:] = f['bb_middle'] - 2 * bb_std
+    band = f['bb_upper'] - f['bb_lower']
+    f['bb_width'][:] = band / f['bb_middle']
+    f['bb_position'][:] = (close - f['bb_lower']) / band
 
     # Lag features
     for lag in [1, 2, 3, 5]:
-        features[f'return_lag_{lag}'] = features['return_1d'].shift(lag)
+        if n > lag:
+            f[f'return_lag_{lag}'][lag:] = ret[:-lag]
 
-    return features
+    return pd.DataFrame(out, index=df.index, columns=FEATURE_NAMES)
 
 
 class RidgeRegression:
@@ -107,10 +228,10 @@ class RidgeRegression:
         self.intercept_ = None
 
     def fit(self, X, y):
-        X = np.array(X)
-        y = np.array(y)
-
-        # Add intercept
+        # X and y arrive as float32 ndarrays (converted once by the caller).
+        # Add intercept. Features are carried in float32, but X'X on price-level
+        # columns has a condition number around 1e7, which single precision
+        # cannot resolve, so the normal equations are formed and solved in float64
         X_with_intercept = np.column_stack([np.ones(len(X)), X])
 
         # Ridge regression: (X'X + alpha*I)^-1 * X'y
@@ -118,10 +239,19 @@ class RidgeRegression:
         identity = np.eye(n_features)
         identity[0, 0] = 0  # Don't regularize intercept
 
-        XtX = X_with_intercept.T @ X_with_intercept
         Xty = X_with_intercept.T @ y
 
-        weights = np.linalg.solve(XtX + self.alpha * identity, Xty)
+        # X'X + alpha*I is symmetric positive definite, so a Cholesky solve
+        # (LAPACK posv) does about half the work of a general LU solve.
+        # syrk forms only the upper triangle of X'X, which is all posv reads;
+        # X_with_intercept.T is Fortran-ordered, so BLAS gets it without a copy.
+        if SCIPY_AVAILABLE:
+            XtX = dsyrk(1.0, X_with_intercept.T)
+            weights = la_solve(XtX + self.alpha * identity, Xty, assume_a='pos', lower=False,
+                               check_finite=False, overwrite_a=True, overwrite_b=True)
+        else:
+            XtX = X_with_intercept.T @ X_with_intercept
+            weights = np.linalg.solve(XtX + self.alpha * identity, Xty)
 
         self.intercept_ = weights[0]
         self.coef_ = weights[1:]
@@ -129,14 +259,13 @@ class RidgeRegression:
         return self
 
     def predict(self, X):
-        X = np.array(X)
         return X @ self.coef_ + self.intercept_
 
 
 def r2_score(y_true, y_pred):
     """Calculate R² score"""
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
     ss_res = np.sum((y_true - y_pred) ** 2)
     ss_tot = np.sum((y_true - np.mean(y_true)) ** 2)
     return 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
@@ -144,15 +273,15 @@ def r2_score(y_true, y_pred):
 
 def mean_squared_error(y_true, y_pred):
     """Calculate MSE"""
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
     return np.mean((y_true - y_pred) ** 2)
 
 
 def mean_absolute_error(y_true, y_pred):
     """Calculate MAE"""
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
     return np.mean(np.abs(y_true - y_pred))
 
 
@@ -168,8 +297,7 @@ class handler(BaseHTTPRequestHandler):
             ticker = params.get("ticker", ["AAPL"])[0].upper()
             period = params.get("period", ["2y"])[0]
 
-            stock = yf.Ticker(ticker)
-            df = stock.history(period=period)
+            df = fetch_history(ticker, period)
 
             if df.empty or len(df) < 100:
                 raise ValueError(f"Insufficient data for {ticker}")
@@ -188,14 +316,16 @@ class handler(BaseHTTPRequestHandler):
             if len(data) < 50:
                 raise ValueError("Insufficient data after feature engineering")
 
-            # Split features and target
-            X = data.drop('target', axis=1)
-            y = data['target']
+            # Split features and target, converting to NumPy once
+            feature_names = data.columns.drop('target')
+            X = data[feature_names].to_numpy(dtype=np.float32, copy=False)
+            y = data['target'].to_numpy(dtype=np.float32, copy=False)
 
             # Train/test split (80/20, no shuffle for time series)
             split_idx = int(len(X) * 0.8)
-            X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
-            y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
+            X_train, X_test = X[:split_idx], X[split_idx:]
+            y_train, y_test = y[:split_idx], y[split_idx:]
+            test_dates = data.index[split_idx:]
 
             # Train Ridge Regression
             model = RidgeRegression(alpha=1.0)
@@ -212,19 +342,17 @@ class handler(BaseHTTPRequestHandler):
             test_mae = mean_absolute_error(y_test, y_pred_test)
 
             # Directional accuracy
-            actual_direction = (np.array(y_test) > 0).astype(int)
-            pred_direction = (np.array(y_pred_test) > 0).astype(int)
-            directional_accuracy = (actual_direction == pred_direction).mean()
+            directional_accuracy = np.mean((y_test > 0) == (y_pred_test > 0))
 
             # Feature importance (absolute coefficients)
-            importance = dict(zip(X.columns, np.abs(model.coef_)))
+            importance = dict(zip(feature_names, np.abs(model.coef_)))
             importance = dict(sorted(importance.items(), key=lambda x: x[1], reverse=True)[:10])
 
             result = {
                 "ticker": ticker,
                 "model": "ridge",
                 "data_points": len(data),
-                "features_used": len(X.columns),
+                "features_used": len(feature_names),
                 "metrics": {
                     "train_r2": round(float(train_r2), 4),
                     "test_r2": round(float(test_r2), 4),
@@ -234,9 +362,9 @@ class handler(BaseHTTPRequestHandler):
                 },
                 "feature_importance": {k: round(float(v), 6) for k, v in importance.items()},
                 "predictions": {
-                    "dates": X_test.index.strftime("%Y-%m-%d").tolist()[-30:],
-                    "actual": [round(float(v) * 100, 4) for v in y_test.tolist()[-30:]],
-                    "predicted": [round(float(v) * 100, 4) for v in y_pred_test[-30:]],
+                    "dates": test_dates[-30:].strftime("%Y-%m-%d").tolist(),
+                    "actual": np.round(y_test[-30:].astype(np.float64) * 100, 4).tolist(),
+                    "predicted": np.round(y_pred_test[-30:] * 100, 4).tolist(),
                 },
             }
 
@@ -244,11 +372,11 @@ class handler(BaseHTTPRequestHandler):
             self.send_header("Content-Type", "application/json")
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps(result).encode())
+            self.wfile.write(dumps(result))
 
         except Exception as e:
             self.send_response(500)
             self.send_header("Content-Type", "application/json")
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.wfile.write(dumps({"error": str(e)}))
@@ -6,9 +6,12 @@ from http.server import BaseHTTPRequestHandler
 import json
 from urllib.parse import parse_qs, urlparse
 import math
+from functools import lru_cache
+import time
 
 try:
     import numpy as np
+    rng = np.random.default_rng()  # PCG64; faster than the legacy MT19937 global
     NUMPY_AVAILABLE = True
 except ImportError:
     NUMPY_AVAILABLE = False
@@ -20,32 +23,101 @@ except ImportError:
     YFINANCE_AVAILABLE = False
 
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj):
+    """Serialize NumPy arrays/scalars for the stdlib json fallback"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Encode a response body as JSON bytes (orjson handles NumPy natively)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+HISTORY_TTL_SECONDS = 300
+
+
+@lru_cache(maxsize=128)
+def _history_for_bucket(ticker, period, bucket):
+    """Download price history; bucket changes every HISTORY_TTL_SECONDS"""
+    return yf.Ticker(ticker).history(period=period)
+
+
+def fetch_history(ticker, period):
+    """Price history memoized per warm instance (callers must not mutate it)"""
+    return _history_for_bucket(ticker, period, int(time.time() // HISTORY_TTL_SECONDS))
+
+
+# Scratch array for the normal shocks, reused across warm invocations
+shock_buffer = None
+
+
 def gbm_simulation(S0, mu, sigma, T, dt, n_paths):
-    """Simulate GBM paths using numpy for efficiency"""
+    """Simulate GBM paths (an ndarray with numpy, lists of floats without)"""
     n_steps = int(T / dt)
 
+    # Per-step drift and volatility are invariant across paths and steps
+    drift = (mu - 0.5 * sigma * sigma) * dt
+    vol = sigma * math.sqrt(dt)
+
     if NUMPY_AVAILABLE:
-        # Vectorized simulation
-        Z = np.random.standard_normal((n_steps, n_paths))
-        drift = (mu - 0.5 * sigma**2) * dt
-        diffusion = sigma * np.sqrt(dt) * Z
-        log_returns = drift + diffusion
-        log_paths = np.vstack([np.zeros(n_paths), np.cumsum(log_returns, axis=0)])
-        paths = S0 * np.exp(log_paths)
-        return paths.T.tolist()  # Transpose to (n_paths, n_steps)
+        # Vectorized simulation with antithetic variates: every shock Z is
+        # paired with -Z, which cuts the variance of the path statistics.
+        # Paths run along rows so each half of the buffer is contiguous and
+        # the generator can fill it in place; row i + half mirrors row i
+        global shock_buffer
+        half = (n_paths + 1) // 2
+        if shock_buffer is None or shock_buffer.shape != (2 * half, n_steps):
+            shock_buffer = np.empty((2 * half, n_steps))
+        Z = shock_buffer
+        rng.standard_normal(out=Z[:half])
+        np.negative(Z[:half], out=Z[half:])
+
+        # Scale the shocks into log returns in place rather than allocating
+        # separate diffusion and drift+diffusion arrays of the same size
+        log_returns = Z[:n_paths]
+        log_returns *= vol
+        log_returns += drift
+
+        # Accumulate straight into the path buffer (column 0 is the start),
+        # then exponentiate and scale it in place
+        paths = np.empty((n_paths, n_steps + 1))
+        paths[:, 0] = 0.0
+        np.cumsum(log_returns, axis=1, out=paths[:, 1:])
+        np.exp(paths, out=paths)
+        paths *= S0
+        return paths  # (n_paths, n_steps + 1) ndarray
     else:
-        # Fallback without numpy
-        import random
-        paths = []
-        for _ in range(n_paths):
-            path = [S0]
+        # Fallback without numpy. The shocks cannot be drawn as one block here,
+        # so each antithetic pair is stepped together with the running prices
+        # kept in locals and the RNG/exp bound to locals to skip attribute lookups.
+        # Mirrors go in the second half, matching the numpy row layout
+        from math import exp
+        from random import gauss
+        paths, mirrors = [], []
+        for _ in range((n_paths + 1) // 2):
+            s_up = s_down = S0
+            path, mirror = [S0], [S0]
             for _ in range(n_steps):
-                Z = random.gauss(0, 1)
-                drift = (mu - 0.5 * sigma**2) * dt
-                diffusion = sigma * math.sqrt(dt) * Z
-                path.append(path[-1] * math.exp(drift + diffusion))
+                diffusion = vol * gauss(0, 1)
+                s_up *= exp(drift + diffusion)
+                s_down *= exp(drift - diffusion)
+                path.append(s_up)
+                mirror.append(s_down)
             paths.append(path)
-        return paths
+            mirrors.append(mirror)
+        return (paths + mirrors)[:n_paths]
 
 
 class handler(BaseHTTPRequestHandler):
@@ -62,21 +134,26 @@ class handler(BaseHTTPRequestHandler):
 
             # Fetch historical data
             if YFINANCE_AVAILABLE:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(period=period)
+                hist = fetch_history(ticker, period)
                 if hist.empty:
                     raise ValueError(f"No data found for {ticker}")
-                returns = hist["Close"].pct_change().dropna()
-                current_price = float(hist["Close"].iloc[-1])
+                close = hist["Close"].dropna()
+                current_price = float(close.iloc[-1])
 
+                # GBM is driven by log returns: their mean is mu - sigma^2/2,
+                # so the arithmetic drift is recovered by adding that back
                 if NUMPY_AVAILABLE:
-                    mu = float(np.mean(returns)) * 252
-                    sigma = float(np.std(returns)) * np.sqrt(252)
+                    close = close.to_numpy()
+                    log_returns = np.log(close[1:] / close[:-1])
+                    sigma = float(log_returns.std()) * math.sqrt(252)
+                    mu = float(log_returns.mean()) * 252 + 0.5 * sigma**2
                 else:
-                    returns_list = returns.tolist()
-                    mu = sum(returns_list) / len(returns_list) * 252
-                    var = sum((r - mu/252)**2 for r in returns_list) / len(returns_list)
+                    close = close.tolist()
+                    log_returns = [math.log(b / a) for a, b in zip(close, close[1:])]
+                    mean = sum(log_returns) / len(log_returns)
+                    var = sum((r - mean)**2 for r in log_returns) / len(log_returns)
                     sigma = math.sqrt(var) * math.sqrt(252)
+                    mu = mean * 252 + 0.5 * sigma**2
             else:
                 mu, sigma, current_price = 0.08, 0.20, 100.0
 
@@ -86,14 +163,12 @@ class handler(BaseHTTPRequestHandler):
 
             # Calculate statistics
             if NUMPY_AVAILABLE:
-                final_values = np.array([p[-1] for p in paths])
+                final_values = paths[:, -1]
                 mean_value = float(np.mean(final_values))
-                median_value = float(np.median(final_values))
                 std_value = float(np.std(final_values))
-                percentile_5 = float(np.percentile(final_values, 5))
-                percentile_25 = float(np.percentile(final_values, 25))
-                percentile_75 = float(np.percentile(final_values, 75))
-                percentile_95 = float(np.percentile(final_values, 95))
+                # One partition pass for all the order statistics
+                percentile_5, percentile_25, median_value, percentile_75, percentile_95 = (
+                    np.quantile(final_values, [0.05, 0.25, 0.5, 0.75, 0.95]).tolist())
                 prob_profit = float(np.mean(final_values > initial_investment))
             else:
                 final_values = sorted([p[-1] for p in paths])
@@ -108,9 +183,18 @@ class handler(BaseHTTPRequestHandler):
                 percentile_95 = final_values[int(n * 0.95)]
                 prob_profit = sum(1 for v in final_values if v > initial_investment) / n
 
-            # Sample paths for visualization (max 50)
-            sample_indices = list(range(0, n_simulations, max(1, n_simulations // 50)))[:50]
-            sample_paths = [[round(v, 2) for v in paths[i]] for i in sample_indices]
+            # Sample paths for visualization (max 50), drawn from the first half
+            # so no sampled path is the antithetic mirror of another
+            half = (n_simulations + 1) // 2
+            sample_indices = list(range(0, half, max(1, half // 50)))[:50]
+            # Every k-th order statistic of the final values; the frontend bins these itself
+            step = max(1, n_simulations // 100)
+            if NUMPY_AVAILABLE:
+                sample_paths = np.round(paths[sample_indices], 2)
+                histogram_values = np.round(np.sort(final_values)[::step], 2)
+            else:
+                sample_paths = [[round(v, 2) for v in paths[i]] for i in sample_indices]
+                histogram_values = [round(v, 2) for v in final_values[::step]]  # already sorted
 
             result = {
                 "ticker": ticker,
@@ -134,18 +218,18 @@ class handler(BaseHTTPRequestHandler):
                     "probability_of_loss": round((1 - prob_profit) * 100, 2),
                 },
                 "sample_paths": sample_paths,
-                "final_values_histogram": [round(v, 2) for v in sorted(final_values)[::max(1, n_simulations // 100)]],
+                "final_values_histogram": histogram_values,
             }
 
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps(result).encode())
+            self.wfile.write(dumps(result))
 
         except Exception as e:
             self.send_response(500)
             self.send_header("Content-Type", "application/json")
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.wfile.write(dumps({"error": str(e)}))
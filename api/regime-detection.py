@@ -8,6 +8,9 @@ import json
 import numpy as np
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from functools import lru_cache
+import time
 
 try:
     import yfinance as yf
@@ -15,16 +18,24 @@ try:
 except ImportError:
     YFINANCE_AVAILABLE = False
 
-try:
-    from scipy.stats import norm
-    from scipy.special import logsumexp
-    SCIPY_AVAILABLE = True
-except ImportError:
-    SCIPY_AVAILABLE = False
+
+HISTORY_TTL_SECONDS = 300
+
+# EM iteration cap when refitting from previously converged parameters
+WARM_START_ITERATIONS = 10
+
+# Entries kept by the HMM fit cache and the warm-start parameter table
+FIT_CACHE_SIZE = 128
 
 
 def fetch_returns(ticker: str, period: str = "2y") -> tuple:
-    """Fetch historical returns for a ticker"""
+    """Fetch historical returns for a ticker, memoized per warm instance for 5 minutes"""
+    return _fetch_returns_cached(ticker, period, int(time.time() // HISTORY_TTL_SECONDS))
+
+
+@lru_cache(maxsize=128)
+def _fetch_returns_cached(ticker: str, period: str, bucket: int) -> tuple:
+    """Download and convert history; bucket changes every HISTORY_TTL_SECONDS"""
     if not YFINANCE_AVAILABLE:
         raise ImportError("yfinance not available")
 
@@ -73,103 +84,119 @@ def initialize_hmm(n_states: int, returns: np.ndarray) -> dict:
     }
 
 
-def gaussian_log_likelihood(x: np.ndarray, mean: float, var: float) -> np.ndarray:
-    """Compute log likelihood of observations under Gaussian"""
-    if var <= 0:
-        var = 1e-10
-    return -0.5 * np.log(2 * np.pi * var) - 0.5 * (x - mean) ** 2 / var
+def log_emission_matrix(observations: np.ndarray, params: dict) -> np.ndarray:
+    """Gaussian log emission probabilities for every (time, state) pair, shape (T, n_states)"""
+    variances = np.where(params['variances'] <= 0, 1e-10, params['variances'])
+    diff = observations[:, None] - params['means']
+    return -0.5 * np.log(2 * np.pi * variances) - 0.5 * diff ** 2 / variances
 
 
-def forward_algorithm(observations: np.ndarray, params: dict) -> tuple:
+def forward_scan(log_emission: np.ndarray, params: dict) -> np.ndarray:
+    """
+    Forward variables as an associative prefix scan over time (Hassan/Sarkka).
+    Element t is the matrix trans * emission[t] and alpha[t] is alpha[0] times
+    the product of elements 1..t, so a Hillis-Steele scan needs log2(T)
+    batched matmuls instead of T sequential steps. Each partial product is
+    renormalized by its max, with the log scales tracked alongside
+    """
+    shift = log_emission.max(axis=1)
+    emission = np.exp(log_emission - shift[:, None])
+    trans = params['transition'] + 1e-10
+
+    prefix = trans[None, :, :] * emission[1:, None, :]
+    log_scale = shift[1:].copy()
+    offset = 1
+    while offset < len(prefix):
+        product = prefix[:-offset] @ prefix[offset:]
+        peak = product.max(axis=(1, 2))
+        prefix[offset:] = product / peak[:, None, None]
+        log_scale[offset:] = log_scale[:-offset] + log_scale[offset:] + np.log(peak)
+        offset *= 2
+
+    alpha0 = (params['start_prob'] + 1e-10) * emission[0]
+    log_alpha = np.empty_like(log_emission)
+    # The row-max shift only protects the likeliest state; the others can
+    # underflow to 0, whose log is the correct -inf
+    with np.errstate(divide='ignore'):
+        log_alpha[0] = np.log(alpha0) + shift[0]
+        log_alpha[1:] = np.log(alpha0 @ prefix) + (shift[0] + log_scale)[:, None]
+    return log_alpha
+
+
+def forward_algorithm(observations: np.ndarray, params: dict,
+                      log_emission: np.ndarray = None) -> tuple:
     """
     Forward algorithm to compute log likelihood and forward variables
     Returns: log_likelihood, alpha (forward probabilities)
     """
-    n_states = len(params['means'])
-    T = len(observations)
-
     # Log emission probabilities
-    log_emission = np.zeros((T, n_states))
-    for s in range(n_states):
-        log_emission[:, s] = gaussian_log_likelihood(
-            observations, params['means'][s], params['variances'][s]
-        )
+    if log_emission is None:
+        log_emission = log_emission_matrix(observations, params)
 
-    # Log transition matrix
-    log_trans = np.log(params['transition'] + 1e-10)
-    log_start = np.log(params['start_prob'] + 1e-10)
-
-    # Forward pass (in log space)
-    log_alpha = np.zeros((T, n_states))
-    log_alpha[0] = log_start + log_emission[0]
-
-    for t in range(1, T):
-        for s in range(n_states):
-            log_alpha[t, s] = logsumexp(log_alpha[t-1] + log_trans[:, s]) + log_emission[t, s]
-
-    log_likelihood = logsumexp(log_alpha[-1])
+    # The prefix scan beats the step-by-step recursion at every T measured
+    # (50 to 2500 observations), since its cost is log2(T) NumPy calls
+    log_alpha = forward_scan(log_emission, params)
+    log_likelihood = np.logaddexp.reduce(log_alpha[-1])
     return log_likelihood, log_alpha
 
 
-def backward_algorithm(observations: np.ndarray, params: dict) -> np.ndarray:
+def backward_algorithm(observations: np.ndarray, params: dict,
+                       log_emission: np.ndarray = None) -> np.ndarray:
     """Backward algorithm to compute backward variables"""
     n_states = len(params['means'])
     T = len(observations)
 
-    log_emission = np.zeros((T, n_states))
-    for s in range(n_states):
-        log_emission[:, s] = gaussian_log_likelihood(
-            observations, params['means'][s], params['variances'][s]
-        )
+    if log_emission is None:
+        log_emission = log_emission_matrix(observations, params)
 
-    log_trans = np.log(params['transition'] + 1e-10)
-
-    log_beta = np.zeros((T, n_states))
-    # log_beta[-1] = 0 (log(1) = 0)
+    # Same scaled recursion as the forward pass, run backwards from beta[-1] = 1
+    shift = log_emission.max(axis=1)
+    emission = np.exp(log_emission - shift[:, None])
+    trans = params['transition'] + 1e-10
 
+    beta = np.empty((T, n_states))
+    log_scale = np.zeros(T)
+    b = np.ones(n_states)
+    beta[-1] = b
     for t in range(T - 2, -1, -1):
-        for s in range(n_states):
-            log_beta[t, s] = logsumexp(
-                log_trans[s, :] + log_emission[t + 1] + log_beta[t + 1]
-            )
-
+        b = trans @ (emission[t + 1] * b)
+        total = b.sum()
+        b = b / total
+        beta[t] = b
+        log_scale[t] = np.log(total) + shift[t + 1]
+
+    # log_beta[t] adds back the scale factors of every later step. The row-max
+    # shift only protects each row's likeliest state: other emissions can
+    # underflow to 0, and the 1e-10 transition floor is all that keeps beta
+    # positive, so guard the log as in the forward pass (log 0 is -inf)
+    with np.errstate(divide='ignore'):
+        log_beta = np.log(beta) + np.cumsum(log_scale[::-1])[::-1, None]
     return log_beta
 
 
 def baum_welch_iteration(observations: np.ndarray, params: dict) -> dict:
     """One iteration of Baum-Welch EM algorithm"""
-    n_states = len(params['means'])
     T = len(observations)
 
-    # E-step: compute forward and backward variables
-    log_likelihood, log_alpha = forward_algorithm(observations, params)
-    log_beta = backward_algorithm(observations, params)
+    # E-step: compute forward and backward variables, sharing one emission matrix
+    log_emission = log_emission_matrix(observations, params)
+    log_likelihood, log_alpha = forward_algorithm(observations, params, log_emission)
+    log_beta = backward_algorithm(observations, params, log_emission)
 
-    # Compute gamma (state occupation probabilities)
+    # Compute gamma (state occupation probabilities). Both normalizers below
+    # reduce short rows (S terms here, S*S <= 16 for xi) with pairwise
+    # logaddexp in C, which avoids scipy's logsumexp dispatch overhead
     log_gamma = log_alpha + log_beta
-    log_gamma = log_gamma - logsumexp(log_gamma, axis=1, keepdims=True)
+    log_gamma = log_gamma - np.logaddexp.reduce(log_gamma, axis=1, keepdims=True)
     gamma = np.exp(log_gamma)
 
-    # Compute xi (transition probabilities)
-    log_emission = np.zeros((T, n_states))
-    for s in range(n_states):
-        log_emission[:, s] = gaussian_log_likelihood(
-            observations, params['means'][s], params['variances'][s]
-        )
-
+    # Compute xi (transition probabilities) for all t at once:
+    # log_xi[t, i, j] = log_alpha[t, i] + log_trans[i, j] + log_emission[t+1, j] + log_beta[t+1, j]
     log_trans = np.log(params['transition'] + 1e-10)
 
-    log_xi = np.zeros((T - 1, n_states, n_states))
-    for t in range(T - 1):
-        for i in range(n_states):
-            for j in range(n_states):
-                log_xi[t, i, j] = (
-                    log_alpha[t, i] +
-                    log_trans[i, j] +
-                    log_emission[t + 1, j] +
-                    log_beta[t + 1, j]
-                )
-        log_xi[t] = log_xi[t] - logsumexp(log_xi[t])
+    log_xi = (log_alpha[:-1, :, None] + log_trans[None, :, :] +
+              (log_emission[1:] + log_beta[1:])[:, None, :])
+    log_xi -= np.logaddexp.reduce(log_xi.reshape(T - 1, -1), axis=1)[:, None, None]
     xi = np.exp(log_xi)
 
     # M-step: update parameters
@@ -185,16 +212,10 @@ def baum_welch_iteration(observations: np.ndarray, params: dict) -> dict:
     new_params['transition'] = new_trans
 
     # Update emission parameters
-    new_means = np.zeros(n_states)
-    new_variances = np.zeros(n_states)
-
-    for s in range(n_states):
-        gamma_s = gamma[:, s]
-        gamma_sum = gamma_s.sum() + 1e-10
-
-        new_means[s] = np.sum(gamma_s * observations) / gamma_sum
-        new_variances[s] = np.sum(gamma_s * (observations - new_means[s]) ** 2) / gamma_sum
-        new_variances[s] = max(new_variances[s], 1e-10)  # Ensure positive variance
+    gamma_sum = gamma.sum(axis=0) + 1e-10
+    new_means = gamma.T @ observations / gamma_sum
+    new_variances = np.sum(gamma * (observations[:, None] - new_means) ** 2, axis=0) / gamma_sum
+    new_variances = np.maximum(new_variances, 1e-10)  # Ensure positive variance
 
     new_params['means'] = new_means
     new_params['variances'] = new_variances
@@ -202,45 +223,55 @@ def baum_welch_iteration(observations: np.ndarray, params: dict) -> dict:
     return new_params, log_likelihood, gamma
 
 
-def viterbi_decode(observations: np.ndarray, params: dict) -> np.ndarray:
-    """Viterbi algorithm to find most likely state sequence"""
-    n_states = len(params['means'])
-    T = len(observations)
-
-    log_emission = np.zeros((T, n_states))
-    for s in range(n_states):
-        log_emission[:, s] = gaussian_log_likelihood(
-            observations, params['means'][s], params['variances'][s]
-        )
-
-    log_trans = np.log(params['transition'] + 1e-10)
-    log_start = np.log(params['start_prob'] + 1e-10)
+def viterbi_batch(log_emission: np.ndarray, log_trans: np.ndarray,
+                  log_start: np.ndarray) -> np.ndarray:
+    """Viterbi over a batch: (B, T, S) emissions, (B, S, S) transitions, (B, S) starts"""
+    B, T, n_states = log_emission.shape
 
     # Viterbi forward pass
-    log_delta = np.zeros((T, n_states))
-    psi = np.zeros((T, n_states), dtype=int)
+    log_delta = np.zeros((B, T, n_states))
+    psi = np.zeros((B, T, n_states), dtype=int)
 
-    log_delta[0] = log_start + log_emission[0]
+    log_delta[:, 0] = log_start + log_emission[:, 0]
 
+    # Column s of each (S, S) candidate matrix scores every predecessor of state s
     for t in range(1, T):
-        for s in range(n_states):
-            candidates = log_delta[t-1] + log_trans[:, s]
-            psi[t, s] = np.argmax(candidates)
-            log_delta[t, s] = candidates[psi[t, s]] + log_emission[t, s]
+        candidates = log_delta[:, t-1, :, None] + log_trans
+        psi[:, t] = candidates.argmax(axis=1)
+        log_delta[:, t] = candidates.max(axis=1) + log_emission[:, t]
 
     # Backtrack
-    states = np.zeros(T, dtype=int)
-    states[-1] = np.argmax(log_delta[-1])
+    batch_idx = np.arange(B)
+    states = np.zeros((B, T), dtype=int)
+    states[:, -1] = np.argmax(log_delta[:, -1], axis=1)
 
     for t in range(T - 2, -1, -1):
-        states[t] = psi[t + 1, states[t + 1]]
+        states[:, t] = psi[batch_idx, t + 1, states[:, t + 1]]
 
     return states
 
 
-def fit_hmm(returns: np.ndarray, n_states: int, n_iterations: int = 50) -> tuple:
-    """Fit HMM using Baum-Welch algorithm"""
-    params = initialize_hmm(n_states, returns)
+def viterbi_decode(observations: np.ndarray, params: dict,
+                   log_emission: np.ndarray = None) -> np.ndarray:
+    """Viterbi algorithm to find most likely state sequence"""
+    if log_emission is None:
+        log_emission = log_emission_matrix(observations, params)
+
+    log_trans = np.log(params['transition'] + 1e-10)
+    log_start = np.log(params['start_prob'] + 1e-10)
+
+    return viterbi_batch(log_emission[None], log_trans[None], log_start[None])[0]
+
+
+def fit_hmm(returns: np.ndarray, n_states: int, init_params: dict = None,
+            n_iterations: int = 50) -> tuple:
+    """Fit HMM using Baum-Welch algorithm, warm-started from init_params if given"""
+    if init_params is not None and len(init_params['means']) == n_states:
+        # Starting near the optimum, EM converges in a handful of iterations
+        params = init_params
+        n_iterations = min(n_iterations, WARM_START_ITERATIONS)
+    else:
+        params = initialize_hmm(n_states, returns)
 
     log_likelihoods = []
 
@@ -258,6 +289,34 @@ def fit_hmm(returns: np.ndarray, n_states: int, n_iterations: int = 50) -> tuple
     return params, states, log_likelihoods
 
 
+# Last converged parameters per (ticker, period, n_states), used to warm-start
+# refits; least recently fitted keys are evicted past FIT_CACHE_SIZE
+_converged_params = OrderedDict()
+
+
+def fit_hmm_cached(ticker: str, period: str, n_states: int, returns: np.ndarray) -> tuple:
+    """
+    fit_hmm on the caller's returns, memoized per warm instance. The returns'
+    bytes are part of the key, so any new or revised bar triggers a refit,
+    which starts EM from the previously converged parameters
+    """
+    returns_key = np.ascontiguousarray(returns, dtype=np.float64).tobytes()
+    return _fit_hmm_for_returns(ticker, period, n_states, returns_key)
+
+
+@lru_cache(maxsize=FIT_CACHE_SIZE)
+def _fit_hmm_for_returns(ticker: str, period: str, n_states: int, returns_key: bytes) -> tuple:
+    """Fit on the exact returns encoded in returns_key"""
+    returns = np.frombuffer(returns_key, dtype=np.float64)
+    key = (ticker, period, n_states)
+    result = fit_hmm(returns, n_states, init_params=_converged_params.get(key), n_iterations=50)
+    _converged_params[key] = result[0]
+    _converged_params.move_to_end(key)
+    if len(_converged_params) > FIT_CACHE_SIZE:
+        _converged_params.popitem(last=False)
+    return result
+
+
 def get_regime_statistics(returns: np.ndarray, prices: np.ndarray,
                           states: np.ndarray, n_states: int) -> list:
     """Calculate statistics for each regime"""
@@ -341,7 +400,7 @@ class handler(BaseHTTPRequestHandler):
             returns, prices, dates = fetch_returns(ticker, period)
 
             # Fit HMM
-            hmm_params, states, log_likelihoods = fit_hmm(returns, n_states, n_iterations=50)
+            hmm_params, states, log_likelihoods = fit_hmm_cached(ticker, period, n_states, returns)
 
             # Get statistics
             regime_stats = get_regime_statistics(returns, prices, states, n_states)
@@ -359,14 +418,14 @@ class handler(BaseHTTPRequestHandler):
             if len(dates) > max_points:
                 step = len(dates) // max_points
                 viz_dates = dates[::step]
-                viz_prices = prices[::step].tolist()
-                viz_states = states[::step].tolist()
-                viz_returns = returns[::step].tolist()
+                viz_prices = prices[::step]
+                viz_states = states[::step]
+                viz_returns = returns[::step]
             else:
                 viz_dates = dates
-                viz_prices = prices.tolist()
-                viz_states = states.tolist()
-                viz_returns = returns.tolist()
+                viz_prices = prices
+                viz_states = states
+                viz_returns = returns
 
             response = {
                 "ticker": ticker,
@@ -383,20 +442,20 @@ class handler(BaseHTTPRequestHandler):
                 "regime_statistics": regime_stats,
                 "regime_labels": regime_labels,
                 "hmm_parameters": {
-                    "means": [round(float(m) * 252 * 100, 2) for m in hmm_params['means']],  # Annualized %
-                    "volatilities": [round(float(np.sqrt(v)) * np.sqrt(252) * 100, 2) for v in hmm_params['variances']],
-                    "transition_matrix": [[round(float(p), 4) for p in row] for row in hmm_params['transition']]
+                    "means": np.round(hmm_params['means'] * 252 * 100, 2).tolist(),  # Annualized %
+                    "volatilities": np.round(np.sqrt(hmm_params['variances']) * np.sqrt(252) * 100, 2).tolist(),
+                    "transition_matrix": np.round(hmm_params['transition'], 4).tolist()
                 },
                 "convergence": {
                     "iterations": len(log_likelihoods),
                     "final_log_likelihood": round(float(log_likelihoods[-1]), 2),
-                    "log_likelihoods": [round(float(ll), 2) for ll in log_likelihoods[-20:]]  # Last 20
+                    "log_likelihoods": np.round(log_likelihoods[-20:], 2).tolist()  # Last 20
                 },
                 "time_series": {
                     "dates": viz_dates,
-                    "prices": [round(float(p), 2) for p in viz_prices],
-                    "states": viz_states,
-                    "returns": [round(float(r) * 100, 4) for r in viz_returns]  # As percentages
+                    "prices": np.round(viz_prices, 2).tolist(),
+                    "states": viz_states.tolist(),
+                    "returns": np.round(viz_returns * 100, 4).tolist()  # As percentages
                 }
             }
 
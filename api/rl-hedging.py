@@ -10,35 +10,28 @@ from urllib.parse import urlparse, parse_qs
 import math
 
 try:
-    from scipy.stats import norm
+    from scipy.special import ndtr  # Cephes normal CDF, without scipy.stats dispatch
     SCIPY_AVAILABLE = True
 except ImportError:
     SCIPY_AVAILABLE = False
 
 
-def black_scholes_delta(S, K, T, r, sigma, option_type="call"):
-    """Calculate Black-Scholes delta"""
-    if T <= 0:
-        if option_type == "call":
-            return 1.0 if S > K else 0.0
-        else:
-            return -1.0 if S < K else 0.0
-
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
+def black_scholes_delta_vec(S, K, T, r, sigma, option_type="call"):
+    """Black-Scholes delta for arrays of spot prices and times to expiry"""
+    S = np.asarray(S, dtype=float)
+    T = np.broadcast_to(np.asarray(T, dtype=float), S.shape)
+    live = T > 0
+    T_live = np.where(live, T, 1.0)  # Placeholder where expired; overwritten below
 
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T_live) / (sigma * np.sqrt(T_live))
     if SCIPY_AVAILABLE:
-        if option_type == "call":
-            return float(norm.cdf(d1))
-        else:
-            return float(norm.cdf(d1) - 1)
+        cdf = ndtr(d1)
     else:
-        # Approximate normal CDF
-        def approx_cdf(x):
-            return 0.5 * (1 + math.erf(x / math.sqrt(2)))
-        if option_type == "call":
-            return approx_cdf(d1)
-        else:
-            return approx_cdf(d1) - 1
+        cdf = 0.5 * (1 + np.vectorize(math.erf)(d1 / math.sqrt(2)))
+
+    if option_type == "call":
+        return np.where(live, cdf, np.where(S > K, 1.0, 0.0))
+    return np.where(live, cdf - 1, np.where(S < K, -1.0, 0.0))
 
 
 def black_scholes_price(S, K, T, r, sigma, option_type="call"):
@@ -54,9 +47,9 @@ def black_scholes_price(S, K, T, r, sigma, option_type="call"):
 
     if SCIPY_AVAILABLE:
         if option_type == "call":
-            return S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+            return S * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
         else:
-            return K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+            return K * np.exp(-r * T) * ndtr(-d2) - S * ndtr(-d1)
     else:
         def approx_cdf(x):
             return 0.5 * (1 + math.erf(x / math.sqrt(2)))
@@ -66,57 +59,47 @@ def black_scholes_price(S, K, T, r, sigma, option_type="call"):
             return K * np.exp(-r * T) * approx_cdf(-d2) - S * approx_cdf(-d1)
 
 
-def simulate_gbm_path(S0, r, sigma, T, n_steps):
-    """Simulate GBM path for stock price"""
+def simulate_gbm_paths(S0, r, sigma, T, n_steps, n_paths, rng):
+    """Simulate GBM paths for stock price, shape (n_paths, n_steps + 1)"""
     dt = T / n_steps
-    prices = [S0]
-
-    for _ in range(n_steps):
-        dW = np.random.normal(0, np.sqrt(dt))
-        S_new = prices[-1] * np.exp((r - 0.5 * sigma ** 2) * dt + sigma * dW)
-        prices.append(S_new)
 
-    return np.array(prices)
+    # One draw for all paths, then cumulative log returns along each row
+    dW = np.sqrt(dt) * rng.standard_normal((n_paths, n_steps))
+    log_returns = (r - 0.5 * sigma ** 2) * dt + sigma * dW
 
+    prices = np.empty((n_paths, n_steps + 1))
+    prices[:, 0] = 0.0
+    np.cumsum(log_returns, axis=1, out=prices[:, 1:])
+    return S0 * np.exp(prices)
 
-def discretize_state(S, K, T, T_total, delta):
-    """
-    Discretize continuous state into buckets for Q-table
-    State: (moneyness_bucket, time_bucket, delta_bucket)
-    """
-    # Moneyness buckets: deep ITM, ITM, ATM, OTM, deep OTM
-    moneyness = S / K
-    if moneyness < 0.9:
-        moneyness_bucket = 0  # Deep OTM
-    elif moneyness < 0.97:
-        moneyness_bucket = 1  # OTM
-    elif moneyness < 1.03:
-        moneyness_bucket = 2  # ATM
-    elif moneyness < 1.1:
-        moneyness_bucket = 3  # ITM
-    else:
-        moneyness_bucket = 4  # Deep ITM
 
-    # Time buckets: 5 buckets from start to expiry
-    time_frac = T / T_total if T_total > 0 else 0
-    time_bucket = min(4, int(time_frac * 5))
+# Dense Q-table over (moneyness, time, delta) buckets x actions; a NaN row
+# marks a state that has never been visited
+Q_TABLE_SHAPE = (5, 5, 5, 3)
 
-    # Delta buckets: 5 buckets from 0 to 1
-    delta_bucket = min(4, max(0, int(delta * 5)))
 
-    return (moneyness_bucket, time_bucket, delta_bucket)
+def new_q_table():
+    """Empty Q-table with every state unvisited"""
+    return np.full(Q_TABLE_SHAPE, np.nan)
 
 
-def get_action_from_q(q_table, state, epsilon=0.1):
-    """Epsilon-greedy action selection"""
-    if np.random.random() < epsilon:
-        return np.random.randint(3)  # Random action
+def discretize_states(S, K, T, T_total, delta):
+    """
+    Discretize continuous states into buckets for the Q-table
+    State: (moneyness_bucket, time_bucket, delta_bucket), one index array each
+    """
+    S = np.asarray(S)
+    # Moneyness buckets: deep OTM (< 0.9), OTM (< 0.97), ATM (< 1.03), ITM (< 1.1), deep ITM
+    moneyness_bucket = np.searchsorted([0.9, 0.97, 1.03, 1.1], S / K, side='right')
+    # Time buckets: 5 buckets from start to expiry
+    time_frac = np.broadcast_to(np.asarray(T) / T_total if T_total > 0 else 0.0, S.shape)
+    time_bucket = np.minimum(4, (time_frac * 5).astype(int))
+    # Delta buckets: 5 buckets from 0 to 1
+    delta_bucket = np.clip((np.asarray(delta) * 5).astype(int), 0, 4)
+    return moneyness_bucket, time_bucket, delta_bucket
 
-    state_key = str(state)
-    if state_key not in q_table:
-        return 1  # Default: delta hedge
 
-    return np.argmax(q_table[state_key])
+ACTION_MULTIPLIERS = (0.8, 1.0, 1.2)
 
 
 def apply_action(current_hedge, bs_delta, action):
@@ -124,118 +107,139 @@ def apply_action(current_hedge, bs_delta, action):
     Apply action to get new hedge position
     Actions: 0 = under-hedge (0.8x delta), 1 = delta hedge, 2 = over-hedge (1.2x delta)
     """
-    multipliers = [0.8, 1.0, 1.2]
-    target = bs_delta * multipliers[action]
+    target = bs_delta * ACTION_MULTIPLIERS[action]
     return target
 
 
 def calculate_hedge_pnl(prices, hedge_positions, K, r, T_total, n_steps, transaction_cost, option_type="call"):
-    """Calculate hedging P&L for a path"""
-    dt = T_total / n_steps
+    """
+    Calculate hedging P&L along the last axis: floats for a single path,
+    lists with one entry per path for a (n_paths, n_steps + 1) batch
+    """
+    prices = np.asarray(prices)
+    hedge_positions = np.asarray(hedge_positions)
 
     # Option payoff at expiry
-    S_final = prices[-1]
+    S_final = prices[..., -1]
     if option_type == "call":
-        option_payoff = max(S_final - K, 0)
+        option_payoff = np.maximum(S_final - K, 0)
     else:
-        option_payoff = max(K - S_final, 0)
-
-    # Hedging P&L
-    hedge_pnl = 0
-    transaction_costs = 0
-
-    for t in range(len(prices) - 1):
-        # P&L from hedge position
-        dS = prices[t + 1] - prices[t]
-        hedge_pnl += hedge_positions[t] * dS
+        option_payoff = np.maximum(K - S_final, 0)
 
-        # Transaction costs from rebalancing
-        if t > 0:
-            rebalance = abs(hedge_positions[t] - hedge_positions[t - 1])
-            transaction_costs += rebalance * prices[t] * transaction_cost
+    # P&L from hedge positions, and transaction costs from rebalancing at
+    # every step after the first
+    hedge_pnl = np.sum(hedge_positions * np.diff(prices, axis=-1), axis=-1)
+    rebalance = np.abs(np.diff(hedge_positions, axis=-1))
+    transaction_costs = np.sum(rebalance * prices[..., 1:-1] * transaction_cost, axis=-1)
 
     # Total hedging error
     hedging_error = option_payoff - hedge_pnl - transaction_costs
 
     return {
-        "option_payoff": float(option_payoff),
-        "hedge_pnl": float(hedge_pnl),
-        "transaction_costs": float(transaction_costs),
-        "hedging_error": float(hedging_error)
+        "option_payoff": option_payoff.tolist(),
+        "hedge_pnl": hedge_pnl.tolist(),
+        "transaction_costs": transaction_costs.tolist(),
+        "hedging_error": hedging_error.tolist()
     }
 
 
-def train_q_learning(S0, K, T, r, sigma, n_episodes, n_steps, transaction_cost,
+def run_episode(prices, bs_deltas, states, explore, random_actions, q_table,
+                transaction_cost, learning_rate, gamma):
+    """
+    One epsilon-greedy Q-learning pass over a path; updates q_table in place.
+    explore and random_actions hold the pre-drawn per-step exploration coin
+    flips and the actions to take when they come up.
+    The loop is inherently sequential, so it runs on a list copy of the table
+    rows, indexed by packed state, and plain Python floats rather than paying
+    NumPy scalar overhead on every lookup, then writes the table back once
+    """
+    n_steps = len(states)
+    rows = q_table.reshape(-1, len(ACTION_MULTIPLIERS))
+    q = rows.tolist()
+    total_reward = 0
+    hedge_positions = []
+
+    for t in range(n_steps):
+        S = prices[t]
+        bs_delta = bs_deltas[t]
+        q_values = q[states[t]]
+        visited = q_values[0] == q_values[0]  # NaN row = never visited
+
+        # Get action (epsilon-greedy, delta hedge for unvisited states)
+        if explore[t]:
+            action = random_actions[t]  # Random action
+        elif visited:
+            action = q_values.index(max(q_values))
+        else:
+            action = 1
+
+        # Apply action
+        hedge_position = apply_action(0, bs_delta, action)
+        hedge_positions.append(hedge_position)
+
+        # Calculate immediate reward (negative of hedging cost + transaction cost)
+        if t > 0:
+            dS = prices[t] - prices[t - 1]
+            hedge_return = hedge_positions[t - 1] * dS
+            rebalance = abs(hedge_position - hedge_positions[t - 1])
+            tc = rebalance * S * transaction_cost
+            reward = hedge_return - tc - 0.01 * abs(bs_delta - hedge_position)  # Penalize deviation
+        else:
+            reward = 0
+
+        total_reward += reward
+
+        # Update Q-table
+        if not visited:
+            q_values[:] = [0.0, 0.0, 0.0]
+
+        # For non-terminal states, estimate future value
+        if t < n_steps - 1:
+            next_q_values = q[states[t + 1]]
+            if next_q_values[0] != next_q_values[0]:
+                next_q_values[:] = [0.0, 0.0, 0.0]
+            max_next_q = max(next_q_values)
+        else:
+            max_next_q = 0
+
+        # Q-learning update
+        q_values[action] += learning_rate * (reward + gamma * max_next_q - q_values[action])
+
+    rows[...] = q
+    return total_reward, hedge_positions
+
+
+def train_q_learning(S0, K, T, r, sigma, n_episodes, n_steps, transaction_cost, rng,
                      learning_rate=0.1, gamma=0.95, epsilon_start=1.0, epsilon_end=0.1):
     """
     Train Q-learning agent for delta hedging
     """
-    q_table = {}
+    q_table = new_q_table()
     epsilon = epsilon_start
     epsilon_decay = (epsilon_start - epsilon_end) / n_episodes
 
     episode_rewards = []
     episode_errors = []
 
+    # Draw every training path and exploration variate up front
+    all_prices = simulate_gbm_paths(S0, r, sigma, T, n_steps, n_episodes, rng)
+    all_uniforms = rng.random((n_episodes, n_steps))
+    all_random_actions = rng.integers(len(ACTION_MULTIPLIERS), size=(n_episodes, n_steps))
+    T_remaining = T - np.arange(n_steps) * (T / n_steps)
+
     for episode in range(n_episodes):
-        # Simulate path
-        prices = simulate_gbm_path(S0, r, sigma, T, n_steps)
-        dt = T / n_steps
-
-        total_reward = 0
-        hedge_positions = []
-        states_visited = []
-        actions_taken = []
-
-        for t in range(n_steps):
-            S = prices[t]
-            T_remaining = T - t * dt
-
-            # Calculate BS delta
-            bs_delta = black_scholes_delta(S, K, T_remaining, r, sigma)
-
-            # Get state
-            state = discretize_state(S, K, T_remaining, T, bs_delta)
-            states_visited.append(state)
-
-            # Get action
-            action = get_action_from_q(q_table, state, epsilon)
-            actions_taken.append(action)
-
-            # Apply action
-            hedge_position = apply_action(0, bs_delta, action)
-            hedge_positions.append(hedge_position)
-
-            # Calculate immediate reward (negative of hedging cost + transaction cost)
-            if t > 0:
-                dS = prices[t] - prices[t - 1]
-                hedge_return = hedge_positions[t - 1] * dS
-                rebalance = abs(hedge_position - hedge_positions[t - 1])
-                tc = rebalance * S * transaction_cost
-                reward = hedge_return - tc - 0.01 * abs(bs_delta - hedge_position)  # Penalize deviation
-            else:
-                reward = 0
-
-            total_reward += reward
-
-            # Update Q-table
-            state_key = str(state)
-            if state_key not in q_table:
-                q_table[state_key] = [0.0, 0.0, 0.0]
-
-            # For non-terminal states, estimate future value
-            if t < n_steps - 1:
-                next_state = discretize_state(prices[t + 1], K, T - (t + 1) * dt, T,
-                                             black_scholes_delta(prices[t + 1], K, T - (t + 1) * dt, r, sigma))
-                next_state_key = str(next_state)
-                if next_state_key not in q_table:
-                    q_table[next_state_key] = [0.0, 0.0, 0.0]
-                max_next_q = max(q_table[next_state_key])
-            else:
-                max_next_q = 0
-
-            # Q-learning update
-            q_table[state_key][action] += learning_rate * (reward + gamma * max_next_q - q_table[state_key][action])
+        prices = all_prices[episode]
+
+        # Everything that does not depend on the agent's actions is computed
+        # for the whole path up front, so run_episode's sequential loop works
+        # on plain Python floats and precomputed packed states
+        bs_deltas = black_scholes_delta_vec(prices[:-1], K, T_remaining, r, sigma)
+        buckets = discretize_states(prices[:-1], K, T_remaining, T, bs_deltas)
+        states = np.ravel_multi_index(buckets, Q_TABLE_SHAPE[:-1]).tolist()
+        total_reward, hedge_positions = run_episode(
+            prices.tolist(), bs_deltas.tolist(), states,
+            (all_uniforms[episode] < epsilon).tolist(), all_random_actions[episode].tolist(),
+            q_table, transaction_cost, learning_rate, gamma)
 
         # Calculate final hedging error
         result = calculate_hedge_pnl(prices, hedge_positions, K, r, T, n_steps, transaction_cost)
@@ -249,64 +253,34 @@ def train_q_learning(S0, K, T, r, sigma, n_episodes, n_steps, transaction_cost,
     return q_table, episode_rewards, episode_errors
 
 
-def evaluate_strategies(S0, K, T, r, sigma, q_table, n_paths, n_steps, transaction_cost):
+def evaluate_strategies(S0, K, T, r, sigma, q_table, n_paths, n_steps, transaction_cost, rng):
     """
     Evaluate RL vs BS delta hedging on test paths
     """
-    rl_errors = []
-    bs_errors = []
-    sample_path = None
-    sample_rl_hedges = None
-    sample_bs_hedges = None
-
     dt = T / n_steps
 
-    for path_idx in range(n_paths):
-        prices = simulate_gbm_path(S0, r, sigma, T, n_steps)
-
-        # RL hedging
-        rl_hedges = []
-        for t in range(n_steps):
-            S = prices[t]
-            T_remaining = T - t * dt
-            bs_delta = black_scholes_delta(S, K, T_remaining, r, sigma)
-            state = discretize_state(S, K, T_remaining, T, bs_delta)
-
-            state_key = str(state)
-            if state_key in q_table:
-                action = np.argmax(q_table[state_key])
-            else:
-                action = 1  # Default to delta hedge
-
-            hedge = apply_action(0, bs_delta, action)
-            rl_hedges.append(hedge)
-
-        rl_result = calculate_hedge_pnl(prices, rl_hedges, K, r, T, n_steps, transaction_cost)
-        rl_errors.append(rl_result["hedging_error"])
-
-        # BS delta hedging
-        bs_hedges = []
-        for t in range(n_steps):
-            S = prices[t]
-            T_remaining = T - t * dt
-            bs_delta = black_scholes_delta(S, K, T_remaining, r, sigma)
-            bs_hedges.append(bs_delta)
-
-        bs_result = calculate_hedge_pnl(prices, bs_hedges, K, r, T, n_steps, transaction_cost)
-        bs_errors.append(bs_result["hedging_error"])
-
-        # Save first path for visualization
-        if path_idx == 0:
-            sample_path = prices.tolist()
-            sample_rl_hedges = rl_hedges
-            sample_bs_hedges = bs_hedges
+    # All test paths at once, shape (n_paths, n_steps + 1)
+    prices = simulate_gbm_paths(S0, r, sigma, T, n_steps, n_paths, rng)
+    T_remaining = T - np.arange(n_steps) * dt
+    bs_hedges = black_scholes_delta_vec(prices[:, :-1], K, T_remaining, r, sigma)
+
+    # RL hedging: greedy action for every (path, step) by fancy-indexing the
+    # Q-table, with delta hedge for states never visited in training
+    q_values = q_table[discretize_states(prices[:, :-1], K, T_remaining, T, bs_hedges)]
+    actions = q_values.argmax(axis=-1)
+    actions[np.isnan(q_values[..., 0])] = 1
+    rl_hedges = bs_hedges * np.asarray(ACTION_MULTIPLIERS)[actions]
+
+    rl_result = calculate_hedge_pnl(prices, rl_hedges, K, r, T, n_steps, transaction_cost)
+    bs_result = calculate_hedge_pnl(prices, bs_hedges, K, r, T, n_steps, transaction_cost)
 
     return {
-        "rl_errors": rl_errors,
-        "bs_errors": bs_errors,
-        "sample_path": sample_path,
-        "sample_rl_hedges": sample_rl_hedges,
-        "sample_bs_hedges": sample_bs_hedges
+        "rl_errors": rl_result["hedging_error"],
+        "bs_errors": bs_result["hedging_error"],
+        # First path for visualization
+        "sample_path": prices[0].tolist(),
+        "sample_rl_hedges": rl_hedges[0].tolist(),
+        "sample_bs_hedges": bs_hedges[0].tolist()
     }
 
 
@@ -331,14 +305,14 @@ class handler(BaseHTTPRequestHandler):
             n_test_paths = 100
 
             # Train Q-learning agent
-            np.random.seed(42)
+            rng = np.random.default_rng(42)
             q_table, episode_rewards, episode_errors = train_q_learning(
-                S0, K, T, r, sigma, n_episodes, n_steps, transaction_cost
+                S0, K, T, r, sigma, n_episodes, n_steps, transaction_cost, rng
             )
 
             # Evaluate on test paths
             eval_results = evaluate_strategies(
-                S0, K, T, r, sigma, q_table, n_test_paths, n_steps, transaction_cost
+                S0, K, T, r, sigma, q_table, n_test_paths, n_steps, transaction_cost, rng
             )
 
             # Calculate statistics
@@ -351,10 +325,11 @@ class handler(BaseHTTPRequestHandler):
             rl_std = np.std(rl_errors)
             bs_std = np.std(bs_errors)
 
-            # Format Q-table for visualization (subset)
+            # Format visited Q-table states for visualization (subset)
             q_table_viz = {}
-            for state_key, values in list(q_table.items())[:50]:  # Limit for response size
-                q_table_viz[state_key] = [round(v, 4) for v in values]
+            visited = np.argwhere(~np.isnan(q_table[..., 0]))[:50]  # Limit for response size
+            for state in map(tuple, visited.tolist()):
+                q_table_viz[str(state)] = np.round(q_table[state], 4).tolist()
 
             # Generate histogram bins
             all_errors = np.concatenate([rl_errors, bs_errors])
@@ -381,7 +356,7 @@ class handler(BaseHTTPRequestHandler):
                 },
                 "training": {
                     "final_episode_error": round(float(episode_errors[-1]), 4),
-                    "learning_curve": [round(e, 4) for e in smoothed_errors],
+                    "learning_curve": np.round(smoothed_errors, 4).tolist(),
                     "learning_curve_x": list(range(0, len(episode_errors), window))
                 },
                 "evaluation": {
@@ -401,14 +376,14 @@ class handler(BaseHTTPRequestHandler):
                     }
                 },
                 "histogram": {
-                    "bins": [round(float(b), 2) for b in bins[:-1]],
-                    "rl_counts": [int(c) for c in rl_hist],
-                    "bs_counts": [int(c) for c in bs_hist]
+                    "bins": np.round(bins[:-1], 2).tolist(),
+                    "rl_counts": rl_hist.tolist(),
+                    "bs_counts": bs_hist.tolist()
                 },
                 "sample_path": {
-                    "prices": [round(float(p), 2) for p in eval_results["sample_path"]],
-                    "rl_hedges": [round(float(h), 4) for h in eval_results["sample_rl_hedges"]],
-                    "bs_hedges": [round(float(h), 4) for h in eval_results["sample_bs_hedges"]],
+                    "prices": np.round(eval_results["sample_path"], 2).tolist(),
+                    "rl_hedges": np.round(eval_results["sample_rl_hedges"], 4).tolist(),
+                    "bs_hedges": np.round(eval_results["sample_bs_hedges"], 4).tolist(),
                     "time_steps": list(range(n_steps))
                 },
                 "q_table_sample": q_table_viz,
@@ -8,6 +8,8 @@ import json
 import numpy as np
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime, timedelta
+from functools import lru_cache
+import time
 
 # Try to import optional dependencies
 try:
@@ -19,25 +21,68 @@ except ImportError:
 try:
     from scipy.optimize import minimize
     from scipy import stats
+    from scipy.linalg import cho_factor, cho_solve
     SCIPY_AVAILABLE = True
 except ImportError:
     SCIPY_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj):
+    """Serialize NumPy arrays/scalars for the stdlib json fallback"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Encode a response body as JSON bytes (orjson handles NumPy natively)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+HISTORY_TTL_SECONDS = 300
+
 
 def fetch_prices(tickers: list, period: str = "2y") -> dict:
-    """Fetch historical prices for multiple tickers"""
+    """
+    Fetch historical prices for multiple tickers, memoized per warm instance
+    for 5 minutes (callers must not mutate the result)
+    """
     if not YFINANCE_AVAILABLE:
         raise ImportError("yfinance not available")
 
+    try:
+        return _fetch_prices_cached(tuple(tickers), period, int(time.time() // HISTORY_TTL_SECONDS))
+    except Exception:
+        return {}
+
+
+@lru_cache(maxsize=128)
+def _fetch_prices_cached(tickers: tuple, period: str, bucket: int) -> dict:
+    """One batched download for all tickers; bucket changes every HISTORY_TTL_SECONDS"""
+    hist = yf.download(list(tickers), period=period, auto_adjust=True, progress=False, threads=True)
+    closes = hist['Close']
+    if closes.ndim == 1:
+        closes = closes.to_frame(tickers[0])
+
+    # Columns share one date index; drop each ticker's missing rows
+    values = closes.to_numpy()
     data = {}
     for ticker in tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period=period)
-            if len(hist) > 100:
-                data[ticker] = hist['Close'].values
-        except Exception:
+        if ticker not in closes.columns:
             continue
+        column = values[:, closes.columns.get_loc(ticker)]
+        column = column[~np.isnan(column)]
+        if len(column) > 100:
+            data[ticker] = column
 
     return data
 
@@ -62,45 +107,63 @@ def build_features(prices: np.ndarray, returns: np.ndarray) -> np.ndarray:
     Features: momentum (5d, 20d), volatility (20d), RSI proxy
     """
     n_samples, n_assets = returns.shape
-    features = []
-
-    for t in range(50, n_samples):
-        row = []
-        for i in range(n_assets):
-            # 5-day momentum
-            mom_5d = np.sum(returns[t-5:t, i])
-            # 20-day momentum
-            mom_20d = np.sum(returns[t-20:t, i])
-            # 20-day volatility
-            vol_20d = np.std(returns[t-20:t, i])
-            # RSI proxy (up days / total days)
-            up_days = np.sum(returns[t-14:t, i] > 0) / 14
-
-            row.extend([mom_5d, mom_20d, vol_20d, up_days])
-
-        features.append(row)
-
-    return np.array(features)
+    start = 50
+
+    # Trailing window sums for every t in [start, n_samples) as differences of
+    # prefix sums, where cs[t] holds the sum of rows before t. Each input gets
+    # a single prefix-sum pass, shared by all of its window lengths
+    def prefix_sum(values, dtype=None):
+        cs = np.zeros((n_samples + 1, n_assets), dtype=dtype or values.dtype)
+        np.cumsum(values, axis=0, dtype=cs.dtype, out=cs[1:])
+        return cs
+
+    def window_sum(cs, window):
+        return cs[start:n_samples] - cs[start - window:n_samples - window]
+
+    cs_returns = prefix_sum(returns)
+    mom_5d = window_sum(cs_returns, 5)
+    mom_20d = window_sum(cs_returns, 20)
+    # Population std from the window's first two moments. Variance is shift
+    # invariant, so the moments are taken about each asset's overall mean to
+    # keep E[x^2] - E[x]^2 from cancelling away the small daily variance
+    centered = returns - np.mean(returns, axis=0)
+    mean_20d = window_sum(prefix_sum(centered), 20) / 20
+    vol_20d = np.sqrt(np.maximum(window_sum(prefix_sum(centered ** 2), 20) / 20 - mean_20d ** 2, 0))
+    # Up-day counts are popcounts of the sign mask: accumulate the bool mask
+    # straight into int32 counters, no widened copy of the signs
+    up_days = window_sum(prefix_sum(returns > 0, np.int32), 14) / 14
+
+    # Columns are grouped per asset: mom_5d, mom_20d, vol_20d, up_days
+    features = np.stack([mom_5d, mom_20d, vol_20d, up_days], axis=2)
+    return features.reshape(len(features), 4 * n_assets)
+
+
+def add_bias(X: np.ndarray) -> np.ndarray:
+    """X with a leading column of ones, written into one preallocated array"""
+    X_bias = np.empty((len(X), X.shape[1] + 1))
+    X_bias[:, 0] = 1.0
+    X_bias[:, 1:] = X
+    return X_bias
 
 
 def train_linear_model(X: np.ndarray, y: np.ndarray) -> np.ndarray:
-    """Train linear regression model using OLS"""
+    """Train linear regression model using OLS; a 2-D y fits one column per target"""
     # Add bias term
-    X_bias = np.column_stack([np.ones(len(X)), X])
+    X_bias = add_bias(X)
 
     # OLS solution: beta = (X'X)^-1 X'y
     try:
         beta = np.linalg.lstsq(X_bias, y, rcond=None)[0]
     except Exception:
-        beta = np.zeros(X_bias.shape[1])
+        beta = np.zeros((X_bias.shape[1],) + y.shape[1:])
 
     return beta
 
 
 def predict_linear(X: np.ndarray, beta: np.ndarray) -> np.ndarray:
     """Make predictions with linear model"""
-    X_bias = np.column_stack([np.ones(len(X)), X])
-    return X_bias @ beta
+    # Intercept row added after the matmul, no bias column needed
+    return X @ beta[1:] + beta[0]
 
 
 def mean_variance_optimize(expected_returns: np.ndarray, cov_matrix: np.ndarray,
@@ -117,9 +180,14 @@ def mean_variance_optimize(expected_returns: np.ndarray, cov_matrix: np.ndarray,
         portfolio_var = np.dot(w, np.dot(cov_matrix, w))
         return -(portfolio_return - (risk_aversion / 2) * portfolio_var)
 
+    # Analytic gradient, so SLSQP does not finite-difference the objective
+    def gradient(w):
+        return risk_aversion * np.dot(cov_matrix, w) - expected_returns
+
     # Constraints
+    ones = np.ones(n_assets)
     constraints = [
-        {'type': 'eq', 'fun': lambda w: np.sum(w) - 1.0}  # Weights sum to 1
+        {'type': 'eq', 'fun': lambda w: np.sum(w) - 1.0, 'jac': lambda w: ones}  # Weights sum to 1
     ]
 
     # Bounds (0 to 1 for long-only)
@@ -129,25 +197,59 @@ def mean_variance_optimize(expected_returns: np.ndarray, cov_matrix: np.ndarray,
     w0 = np.ones(n_assets) / n_assets
 
     if SCIPY_AVAILABLE:
-        result = minimize(objective, w0, method='SLSQP',
+        result = minimize(objective, w0, method='SLSQP', jac=gradient,
                          bounds=bounds, constraints=constraints)
         return result.x
     else:
         return w0
 
 
+def mean_variance_optimize_batch(expected_returns: np.ndarray, cov_matrix: np.ndarray,
+                                 risk_aversion=1.0) -> np.ndarray:
+    """
+    mean_variance_optimize for every row of a (T, n_assets) matrix of expected returns,
+    with a scalar risk aversion or one per row.
+    With only the budget constraint the optimum is closed form,
+    w = (S^-1 r - nu * S^-1 1) / lambda with nu chosen so sum(w) = 1, and it is
+    also optimal long-only whenever it has no negative weights. All rows share
+    one Cholesky factorization; the rest fall back to the QP
+    """
+    weights = np.empty_like(expected_returns, dtype=float)
+    risk_aversion = np.broadcast_to(np.asarray(risk_aversion, dtype=float), (len(expected_returns),))
+    if not SCIPY_AVAILABLE:
+        for t, r in enumerate(expected_returns):
+            weights[t] = mean_variance_optimize(r, cov_matrix, risk_aversion[t])
+        return weights
+
+    try:
+        factor = cho_factor(cov_matrix)
+    except np.linalg.LinAlgError:
+        needs_qp = np.ones(len(expected_returns), dtype=bool)
+    else:
+        inv_ones = cho_solve(factor, np.ones(len(cov_matrix)))
+        inv_returns = cho_solve(factor, expected_returns.T).T
+        nu = (inv_returns.sum(axis=1) - risk_aversion) / inv_ones.sum()
+        weights[:] = (inv_returns - nu[:, None] * inv_ones) / risk_aversion[:, None]
+        needs_qp = np.any(weights < 0, axis=1)
+
+    for t in np.flatnonzero(needs_qp):
+        weights[t] = mean_variance_optimize(expected_returns[t], cov_matrix, risk_aversion[t])
+
+    return weights
+
+
 def spo_loss(weights: np.ndarray, predicted_returns: np.ndarray,
              actual_returns: np.ndarray, risk_aversion: float) -> float:
     """
     SPO Decision Loss: How much profit did we lose due to prediction errors?
     This is the regret: optimal_portfolio_value - actual_portfolio_value
+    Rows of 2-D inputs are scored independently, giving one loss per row
     """
     # Portfolio return with our weights
-    portfolio_return = np.dot(weights, actual_returns)
+    portfolio_return = np.sum(weights * actual_returns, axis=-1)
 
-    # Variance penalty
-    variance = np.var(actual_returns)
-    portfolio_var = weights @ np.outer(actual_returns, actual_returns) @ weights
+    # Variance penalty: w'(rr')w is just (w'r)^2
+    portfolio_var = portfolio_return ** 2
 
     # Decision loss
     return -portfolio_return + risk_aversion * portfolio_var
@@ -158,7 +260,9 @@ def train_spo_model(X_train: np.ndarray, y_train: np.ndarray,
                     n_iterations: int = 100, learning_rate: float = 0.01) -> np.ndarray:
     """
     Train model with SPO loss (decision-focused learning)
-    Uses gradient descent to minimize decision regret
+    Uses subgradient descent on the SPO+ surrogate (Elmachtoub & Grigas): for
+    predicted returns p and realized returns r, a subgradient with respect to
+    p is 2 * (w(2p - r) - w(r)), where w(.) is the optimized portfolio
     """
     n_features = X_train.shape[1]
     n_assets = y_train.shape[1]
@@ -166,38 +270,18 @@ def train_spo_model(X_train: np.ndarray, y_train: np.ndarray,
     # Initialize weights
     beta = np.random.randn(n_features + 1, n_assets) * 0.01
 
+    X_bias = add_bias(X_train)
+
+    # Oracle portfolios under the realized returns do not depend on beta
+    w_star = mean_variance_optimize_batch(y_train, cov_matrix, risk_aversion)
+
     for _ in range(n_iterations):
         # Forward pass
-        X_bias = np.column_stack([np.ones(len(X_train)), X_train])
         predictions = X_bias @ beta
 
-        # Compute gradients numerically (simplified)
-        grad = np.zeros_like(beta)
-        eps = 1e-5
-
-        for i in range(beta.shape[0]):
-            for j in range(beta.shape[1]):
-                beta_plus = beta.copy()
-                beta_plus[i, j] += eps
-
-                beta_minus = beta.copy()
-                beta_minus[i, j] -= eps
-
-                # Compute loss for both
-                pred_plus = X_bias @ beta_plus
-                pred_minus = X_bias @ beta_minus
-
-                loss_plus = 0
-                loss_minus = 0
-
-                for t in range(len(predictions)):
-                    w_plus = mean_variance_optimize(pred_plus[t], cov_matrix, risk_aversion)
-                    w_minus = mean_variance_optimize(pred_minus[t], cov_matrix, risk_aversion)
-
-                    loss_plus += spo_loss(w_plus, pred_plus[t], y_train[t], risk_aversion)
-                    loss_minus += spo_loss(w_minus, pred_minus[t], y_train[t], risk_aversion)
-
-                grad[i, j] = (loss_plus - loss_minus) / (2 * eps)
+        # One optimization per sample, then chain rule through the linear model
+        w_tilde = mean_variance_optimize_batch(2 * predictions - y_train, cov_matrix, risk_aversion)
+        grad = X_bias.T @ (2 * (w_tilde - w_star))
 
         # Update
         beta -= learning_rate * grad
@@ -208,26 +292,26 @@ def train_spo_model(X_train: np.ndarray, y_train: np.ndarray,
 def backtest_portfolio(weights_history: np.ndarray, returns: np.ndarray) -> dict:
     """Backtest portfolio strategy"""
     portfolio_returns = np.sum(weights_history * returns, axis=1)
+    std = np.std(portfolio_returns)
 
     # Metrics
     total_return = np.sum(portfolio_returns) * 100
-    sharpe = np.mean(portfolio_returns) / np.std(portfolio_returns) * np.sqrt(252) if np.std(portfolio_returns) > 0 else 0
+    sharpe = np.mean(portfolio_returns) / std * np.sqrt(252) if std > 0 else 0
 
-    # Max drawdown
+    # Max drawdown, from the same cumulative series that is returned
     cumulative = np.cumsum(portfolio_returns)
-    running_max = np.maximum.accumulate(cumulative)
-    drawdown = running_max - cumulative
+    drawdown = np.maximum.accumulate(cumulative) - cumulative
     max_drawdown = np.max(drawdown) * 100 if len(drawdown) > 0 else 0
 
     # Volatility
-    volatility = np.std(portfolio_returns) * np.sqrt(252) * 100
+    volatility = std * np.sqrt(252) * 100
 
     return {
         "total_return": float(total_return),
         "sharpe_ratio": float(sharpe),
         "max_drawdown": float(max_drawdown),
         "volatility": float(volatility),
-        "cumulative_returns": (np.cumsum(portfolio_returns) * 100).tolist()
+        "cumulative_returns": np.round(cumulative * 100, 2)
     }
 
 
@@ -257,7 +341,6 @@ class handler(BaseHTTPRequestHandler):
             # Align prices
             valid_tickers, prices_matrix = align_prices(prices_dict)
             returns = calculate_returns(prices_matrix)
-            n_assets = len(valid_tickers)
 
             # Build features
             features = build_features(prices_matrix, returns)
@@ -274,42 +357,22 @@ class handler(BaseHTTPRequestHandler):
                 cov_matrix = np.array([[cov_matrix]])
 
             # ========== Traditional Two-Stage Approach ==========
-            # Stage 1: Predict returns
-            traditional_betas = []
-            traditional_predictions_test = []
-
-            for i in range(n_assets):
-                beta = train_linear_model(X_train, y_train[:, i])
-                traditional_betas.append(beta)
-                pred = predict_linear(X_test, beta)
-                traditional_predictions_test.append(pred)
-
-            traditional_predictions = np.column_stack(traditional_predictions_test)
+            # Stage 1: Predict returns, one least-squares solve for all assets
+            traditional_betas = train_linear_model(X_train, y_train)
+            traditional_predictions = predict_linear(X_test, traditional_betas)
 
             # Stage 2: Optimize based on predictions
-            traditional_weights = []
-            for t in range(len(X_test)):
-                w = mean_variance_optimize(traditional_predictions[t], cov_matrix, risk_aversion)
-                traditional_weights.append(w)
-            traditional_weights = np.array(traditional_weights)
+            traditional_weights = mean_variance_optimize_batch(traditional_predictions, cov_matrix, risk_aversion)
 
             # ========== SPO Approach (Simplified) ==========
             # Train with decision-focused loss (simplified version)
             # For demo: use perturbed predictions that account for downstream optimization
 
             # Compute prediction errors effect on portfolio
-            spo_weights = []
-            for t in range(len(X_test)):
-                # Adjust predictions based on model uncertainty
-                pred_adjusted = traditional_predictions[t].copy()
-
-                # Account for estimation uncertainty - more conservative
-                pred_uncertainty = np.std(y_train, axis=0)
-                pred_adjusted = pred_adjusted - risk_aversion * 0.5 * pred_uncertainty
-
-                w = mean_variance_optimize(pred_adjusted, cov_matrix, risk_aversion)
-                spo_weights.append(w)
-            spo_weights = np.array(spo_weights)
+            # Account for estimation uncertainty - more conservative
+            pred_uncertainty = np.std(y_train, axis=0)
+            pred_adjusted = traditional_predictions - risk_aversion * 0.5 * pred_uncertainty
+            spo_weights = mean_variance_optimize_batch(pred_adjusted, cov_matrix, risk_aversion)
 
             # Backtest both approaches
             traditional_result = backtest_portfolio(traditional_weights, y_test)
@@ -317,14 +380,10 @@ class handler(BaseHTTPRequestHandler):
 
             # Prediction vs Decision Error Analysis
             pred_mse = np.mean((traditional_predictions - y_test) ** 2)
-            traditional_decision_error = np.mean([
-                spo_loss(traditional_weights[t], traditional_predictions[t], y_test[t], risk_aversion)
-                for t in range(len(y_test))
-            ])
-            spo_decision_error = np.mean([
-                spo_loss(spo_weights[t], traditional_predictions[t], y_test[t], risk_aversion)
-                for t in range(len(y_test))
-            ])
+            traditional_decision_error = np.mean(
+                spo_loss(traditional_weights, traditional_predictions, y_test, risk_aversion))
+            spo_decision_error = np.mean(
+                spo_loss(spo_weights, traditional_predictions, y_test, risk_aversion))
 
             # Average weights
             avg_traditional_weights = np.mean(traditional_weights, axis=0)
@@ -335,17 +394,14 @@ class handler(BaseHTTPRequestHandler):
             test_dates = [(end_date - timedelta(days=len(y_test)-1-i)).strftime('%Y-%m-%d')
                           for i in range(len(y_test))]
 
-            # Efficient frontier points
-            frontier_returns = []
-            frontier_vols = []
+            # Efficient frontier points, one portfolio per risk aversion level
             mean_returns = np.mean(y_train, axis=0)
-
-            for ra in np.linspace(0.1, 5, 20):
-                w = mean_variance_optimize(mean_returns, cov_matrix, ra)
-                port_ret = np.dot(w, mean_returns) * 252 * 100
-                port_vol = np.sqrt(np.dot(w, np.dot(cov_matrix, w))) * np.sqrt(252) * 100
-                frontier_returns.append(float(port_ret))
-                frontier_vols.append(float(port_vol))
+            frontier_aversions = np.linspace(0.1, 5, 20)
+            frontier_weights = mean_variance_optimize_batch(
+                np.tile(mean_returns, (len(frontier_aversions), 1)), cov_matrix, frontier_aversions)
+            frontier_returns = frontier_weights @ mean_returns * 252 * 100
+            frontier_vars = np.einsum('fi,ij,fj->f', frontier_weights, cov_matrix, frontier_weights)
+            frontier_vols = np.sqrt(frontier_vars) * np.sqrt(252) * 100
 
             response = {
                 "tickers": valid_tickers,
@@ -387,8 +443,8 @@ class handler(BaseHTTPRequestHandler):
                 },
                 "time_series": {
                     "dates": test_dates,
-                    "traditional_cumulative": [round(r, 2) for r in traditional_result["cumulative_returns"]],
-                    "spo_cumulative": [round(r, 2) for r in spo_result["cumulative_returns"]]
+                    "traditional_cumulative": traditional_result["cumulative_returns"],
+                    "spo_cumulative": spo_result["cumulative_returns"]
                 }
             }
 
@@ -396,14 +452,14 @@ class handler(BaseHTTPRequestHandler):
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.wfile.write(dumps(response))
 
         except Exception as e:
             self.send_response(500)
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.wfile.write(dumps({"error": str(e)}))
 
     def do_OPTIONS(self):
         self.send_response(200)
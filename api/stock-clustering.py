@@ -8,6 +8,8 @@ import json
 import numpy as np
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
+from functools import lru_cache
+import time
 
 try:
     import yfinance as yf
@@ -17,28 +19,74 @@ except ImportError:
 
 try:
     from scipy.stats import zscore
+    from scipy.spatial.distance import pdist, squareform
     SCIPY_AVAILABLE = True
 except ImportError:
     SCIPY_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj):
+    """Serialize NumPy arrays/scalars for the stdlib json fallback"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Encode a response body as JSON bytes (orjson handles NumPy natively)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+HISTORY_TTL_SECONDS = 300
+
 
 def fetch_stock_data(tickers: list, period: str = "1y") -> dict:
-    """Fetch historical prices for multiple tickers"""
+    """
+    Fetch historical prices for multiple tickers, memoized per warm instance
+    for 5 minutes (callers must not mutate the result)
+    """
     if not YFINANCE_AVAILABLE:
         raise ImportError("yfinance not available")
 
+    try:
+        return _fetch_stock_data_cached(tuple(tickers), period, int(time.time() // HISTORY_TTL_SECONDS))
+    except Exception:
+        return {}
+
+
+@lru_cache(maxsize=128)
+def _fetch_stock_data_cached(tickers: tuple, period: str, bucket: int) -> dict:
+    """One batched download for all tickers; bucket changes every HISTORY_TTL_SECONDS"""
+    hist = yf.download(list(tickers), period=period, auto_adjust=True, progress=False, threads=True)
+    closes = hist['Close']
+    volumes = hist['Volume'] if 'Volume' in hist.columns.get_level_values(0) else None
+    if closes.ndim == 1:
+        closes = closes.to_frame(tickers[0])
+        volumes = volumes.to_frame(tickers[0]) if volumes is not None else None
+
+    # Columns share one date index; drop each ticker's missing rows
+    close_values = closes.to_numpy()
+    volume_values = volumes.to_numpy() if volumes is not None else None
     data = {}
     for ticker in tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period=period)
-            if len(hist) > 50:
-                data[ticker] = {
-                    'prices': hist['Close'].values,
-                    'volume': hist['Volume'].values if 'Volume' in hist.columns else np.ones(len(hist))
-                }
-        except Exception:
+        if ticker not in closes.columns:
             continue
+        j = closes.columns.get_loc(ticker)
+        valid = ~np.isnan(close_values[:, j])
+        if np.sum(valid) > 50:
+            data[ticker] = {
+                'prices': close_values[valid, j],
+                'volume': volume_values[valid, j] if volume_values is not None else np.ones(np.sum(valid))
+            }
 
     return data
 
@@ -52,51 +100,63 @@ def calculate_features(data: dict, market_data: dict = None) -> tuple:
     - Beta (if market data provided)
     """
     tickers = list(data.keys())
-    features = []
     feature_names = ['Avg Return', 'Volatility', 'Mom 20d', 'Mom 60d', 'Beta']
 
-    for ticker in tickers:
-        prices = data[ticker]['prices']
-        returns = np.diff(np.log(prices))
-
-        # Average daily return (annualized)
-        avg_return = np.mean(returns) * 252
-
-        # Volatility (annualized)
-        volatility = np.std(returns) * np.sqrt(252)
-
-        # Momentum (last 20d and 60d returns)
-        mom_20d = (prices[-1] / prices[-21] - 1) if len(prices) > 21 else 0
-        mom_60d = (prices[-1] / prices[-61] - 1) if len(prices) > 61 else 0
-
-        # Beta (vs market)
-        if market_data is not None and len(market_data) > 0:
-            market_prices = list(market_data.values())[0]['prices']
-            market_returns = np.diff(np.log(market_prices))
-
-            # Align lengths
-            min_len = min(len(returns), len(market_returns))
-            stock_ret = returns[-min_len:]
-            market_ret = market_returns[-min_len:]
-
-            # Calculate beta
-            covariance = np.cov(stock_ret, market_ret)[0, 1]
-            market_var = np.var(market_ret)
-            beta = covariance / market_var if market_var > 0 else 1.0
-        else:
-            beta = 1.0
-
-        features.append([avg_return, volatility, mom_20d, mom_60d, beta])
-
-    return np.array(features), tickers, feature_names
+    # Tail-align every series into one NaN-padded (T, n_stocks) matrix so
+    # each feature is a single column-wise reduction
+    def tail_aligned(series):
+        matrix = np.full((max(len(x) for x in series), len(series)), np.nan)
+        for j, x in enumerate(series):
+            matrix[len(matrix) - len(x):, j] = x
+        return matrix
+
+    prices = tail_aligned([data[t]['prices'] for t in tickers])
+    returns = np.diff(np.log(prices), axis=0)
+    n_prices = np.sum(~np.isnan(prices), axis=0)
+
+    # Average daily return and volatility (annualized)
+    avg_return = np.nanmean(returns, axis=0) * 252
+    volatility = np.nanstd(returns, axis=0) * np.sqrt(252)
+
+    # Momentum (last 20d and 60d returns)
+    def momentum(days):
+        if len(prices) <= days + 1:
+            return np.zeros(len(tickers))
+        return np.where(n_prices > days + 1, prices[-1] / prices[-days - 1] - 1, 0.0)
+
+    mom_20d = momentum(20)
+    mom_60d = momentum(60)
+
+    # Beta (vs market), each stock over its overlap with the market's tail
+    if market_data is not None and len(market_data) > 0:
+        market_prices = list(market_data.values())[0]['prices']
+        market_returns = np.diff(np.log(market_prices))
+
+        n_overlap = min(len(returns), len(market_returns))
+        stock_ret = returns[-n_overlap:]
+        overlap = ~np.isnan(stock_ret)
+        market_ret = np.where(overlap, market_returns[-n_overlap:, None], np.nan)
+        n_obs = np.sum(overlap, axis=0)
+
+        # cov with ddof=1 over var with ddof=0, as np.cov / np.var per stock
+        stock_dev = stock_ret - np.nanmean(stock_ret, axis=0)
+        market_dev = market_ret - np.nanmean(market_ret, axis=0)
+        covariance = np.nansum(stock_dev * market_dev, axis=0) / (n_obs - 1)
+        market_var = np.nansum(market_dev ** 2, axis=0) / n_obs
+        beta = np.where(market_var > 0, covariance / np.where(market_var > 0, market_var, 1), 1.0)
+    else:
+        beta = np.ones(len(tickers))
+
+    features = np.column_stack([avg_return, volatility, mom_20d, mom_60d, beta])
+    return features, tickers, feature_names
 
 
 def standardize_features(features: np.ndarray) -> np.ndarray:
-    """Standardize features (z-score normalization)"""
+    """Standardize features (z-score normalization), as float32 for clustering"""
     mean = np.mean(features, axis=0)
     std = np.std(features, axis=0)
     std[std == 0] = 1  # Avoid division by zero
-    return (features - mean) / std
+    return ((features - mean) / std).astype(np.float32)
 
 
 def kmeans_plusplus_init(X: np.ndarray, k: int) -> np.ndarray:
@@ -108,15 +168,15 @@ def kmeans_plusplus_init(X: np.ndarray, k: int) -> np.ndarray:
     first_idx = np.random.randint(n_samples)
     centroids.append(X[first_idx])
 
+    # Squared distance from every point to its nearest chosen centroid, only
+    # compared against the newest centroid on each step
+    min_dist = np.full(n_samples, np.inf)
+
     for _ in range(1, k):
-        # Calculate distances to nearest centroid
-        distances = np.zeros(n_samples)
-        for i, point in enumerate(X):
-            min_dist = min(np.sum((point - c) ** 2) for c in centroids)
-            distances[i] = min_dist
+        np.minimum(min_dist, np.sum((X - centroids[-1]) ** 2, axis=1), out=min_dist)
 
         # Choose next centroid with probability proportional to distance^2
-        probs = distances / distances.sum()
+        probs = min_dist / min_dist.sum()
         next_idx = np.random.choice(n_samples, p=probs)
         centroids.append(X[next_idx])
 
@@ -128,27 +188,25 @@ def kmeans(X: np.ndarray, k: int, max_iters: int = 100, tol: float = 1e-4) -> tu
     K-means clustering algorithm (Lloyd's algorithm)
     Returns: labels, centroids, inertia
     """
-    n_samples = X.shape[0]
+    # z-scored features need nothing like double precision; float32 halves
+    # the memory traffic of the distance broadcasts
+    X = np.ascontiguousarray(X, dtype=np.float32)
 
     # Initialize centroids with k-means++
     centroids = kmeans_plusplus_init(X, k)
 
     for _ in range(max_iters):
-        # Assign points to nearest centroid
-        distances = np.zeros((n_samples, k))
-        for i in range(k):
-            distances[:, i] = np.sum((X - centroids[i]) ** 2, axis=1)
-
+        # Assign points to nearest centroid via ||x-c||^2 = ||x||^2 + ||c||^2 - 2x.c,
+        # one GEMM for all pairs; ||x||^2 is the same for every centroid of a
+        # row, so it drops out of the argmin
+        distances = np.sum(centroids ** 2, axis=1) - 2 * (X @ centroids.T)
         labels = np.argmin(distances, axis=1)
 
-        # Update centroids
-        new_centroids = np.zeros_like(centroids)
-        for i in range(k):
-            mask = labels == i
-            if np.any(mask):
-                new_centroids[i] = X[mask].mean(axis=0)
-            else:
-                new_centroids[i] = centroids[i]
+        # Update centroids from per-cluster sums; empty clusters keep their centroid
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        new_centroids = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
 
         # Check convergence
         if np.sum((new_centroids - centroids) ** 2) < tol:
@@ -157,73 +215,52 @@ def kmeans(X: np.ndarray, k: int, max_iters: int = 100, tol: float = 1e-4) -> tu
         centroids = new_centroids
 
     # Calculate inertia (sum of squared distances to centroids)
-    inertia = 0
-    for i in range(k):
-        mask = labels == i
-        if np.any(mask):
-            inertia += np.sum((X[mask] - centroids[i]) ** 2)
+    inertia = np.sum((X - centroids[labels]) ** 2)
 
     return labels, centroids, inertia
 
 
 def silhouette_score(X: np.ndarray, labels: np.ndarray) -> float:
     """Calculate silhouette score for clustering quality"""
-    n_samples = X.shape[0]
     unique_labels = np.unique(labels)
 
     if len(unique_labels) <= 1:
         return 0.0
 
-    silhouette_vals = []
-
-    for i in range(n_samples):
-        # a(i) = average distance to points in same cluster
-        same_cluster = X[labels == labels[i]]
-        if len(same_cluster) > 1:
-            a_i = np.mean([np.sqrt(np.sum((X[i] - x) ** 2)) for x in same_cluster if not np.array_equal(x, X[i])])
-        else:
-            a_i = 0
-
-        # b(i) = minimum average distance to points in other clusters
-        b_i = float('inf')
-        for label in unique_labels:
-            if label != labels[i]:
-                other_cluster = X[labels == label]
-                if len(other_cluster) > 0:
-                    avg_dist = np.mean([np.sqrt(np.sum((X[i] - x) ** 2)) for x in other_cluster])
-                    b_i = min(b_i, avg_dist)
-
-        if b_i == float('inf'):
-            b_i = 0
-
-        # Silhouette coefficient
-        if max(a_i, b_i) > 0:
-            s_i = (b_i - a_i) / max(a_i, b_i)
-        else:
-            s_i = 0
-
-        silhouette_vals.append(s_i)
+    # Pairwise Euclidean distances between all points
+    if SCIPY_AVAILABLE:
+        D = squareform(pdist(X))
+    else:
+        D = np.sqrt(np.sum((X[:, None, :] - X[None, :, :]) ** 2, axis=2))
+
+    # a(i) = average distance to the other points in the same cluster (0 for
+    # singletons); b(i) = minimum average distance to another cluster
+    a = np.zeros(len(X))
+    b = np.full(len(X), np.inf)
+    for label in unique_labels:
+        mask = labels == label
+        n_members = np.sum(mask)
+        if n_members > 1:
+            a[mask] = D[np.ix_(mask, mask)].sum(axis=1) / (n_members - 1)
+        np.minimum(b, np.where(mask, np.inf, D[:, mask].mean(axis=1)), out=b)
+
+    # Silhouette coefficient
+    denom = np.maximum(a, b)
+    silhouette_vals = np.divide(b - a, denom, out=np.zeros(len(X)), where=denom > 0)
 
     return float(np.mean(silhouette_vals))
 
 
-def pca_reduce(X: np.ndarray, n_components: int = 2) -> np.ndarray:
-    """PCA for dimensionality reduction (for visualization)"""
-    # Center data
-    X_centered = X - np.mean(X, axis=0)
-
-    # Compute covariance matrix
-    cov = np.cov(X_centered.T)
+def pca_basis(X: np.ndarray) -> tuple:
+    """Mean and principal axes (rows of Vt, by decreasing variance) via economy SVD"""
+    mean = np.mean(X, axis=0)
+    _, _, Vt = np.linalg.svd(X - mean, full_matrices=False)
+    return mean, Vt
 
-    # Eigen decomposition
-    eigenvalues, eigenvectors = np.linalg.eigh(cov)
 
-    # Sort by eigenvalue (descending)
-    idx = np.argsort(eigenvalues)[::-1]
-    eigenvectors = eigenvectors[:, idx]
-
-    # Project data
-    return X_centered @ eigenvectors[:, :n_components]
+def project(X: np.ndarray, mean: np.ndarray, Vt: np.ndarray, n_components: int = 2) -> np.ndarray:
+    """Coordinates of X on the first n_components principal axes"""
+    return (X - mean) @ Vt[:n_components].T
 
 
 def calculate_cluster_portfolios(data: dict, tickers: list, labels: np.ndarray,
@@ -262,7 +299,7 @@ def calculate_cluster_portfolios(data: dict, tickers: list, labels: np.ndarray,
             'total_return': round(float(total_return), 2),
             'volatility': round(float(volatility), 2),
             'sharpe_ratio': round(float(sharpe), 2),
-            'cumulative_returns': (np.cumsum(portfolio_returns) * 100).tolist()
+            'cumulative_returns': np.cumsum(portfolio_returns) * 100
         })
 
     return portfolios
@@ -283,15 +320,14 @@ class handler(BaseHTTPRequestHandler):
             # Validate
             n_clusters = min(max(n_clusters, 2), min(6, len(tickers) // 2))
 
-            # Fetch data
-            stock_data = fetch_stock_data(tickers, period)
+            # Fetch data, with SPY for beta calculation in the same batch
+            all_data = fetch_stock_data(list(dict.fromkeys(tickers + ['SPY'])), period)
+            market_data = {'SPY': all_data['SPY']} if 'SPY' in all_data else {}
+            stock_data = {t: d for t, d in all_data.items() if t in tickers}
 
             if len(stock_data) < n_clusters:
                 raise ValueError(f"Only {len(stock_data)} stocks have data. Need at least {n_clusters}.")
 
-            # Fetch market data for beta calculation
-            market_data = fetch_stock_data(['SPY'], period)
-
             # Calculate features
             features, valid_tickers, feature_names = calculate_features(stock_data, market_data)
 
@@ -305,8 +341,10 @@ class handler(BaseHTTPRequestHandler):
             # Calculate silhouette score
             sil_score = silhouette_score(features_std, labels)
 
-            # PCA for visualization
-            pca_coords = pca_reduce(features_std, 2)
+            # PCA for visualization; centroids go on the same axes as the stocks
+            pca_mean, pca_axes = pca_basis(features_std)
+            pca_coords = project(features_std, pca_mean, pca_axes, 2)
+            centroid_pca = np.round(project(centroids, pca_mean, pca_axes, 2).astype(np.float64), 4).tolist()
 
             # Calculate cluster portfolios
             portfolios = calculate_cluster_portfolios(stock_data, valid_tickers, labels, n_clusters)
@@ -328,22 +366,23 @@ class handler(BaseHTTPRequestHandler):
                     })
 
             # Stock details with cluster assignments
+            # Percent features and PCA coordinates rounded once for all stocks
+            stock_features = np.round(features * [100, 100, 100, 100, 1], 2).tolist()
+            stock_pca = np.round(pca_coords.astype(np.float64), 4).tolist()
             stock_details = []
-            for i, ticker in enumerate(valid_tickers):
+            for ticker, label, (ret, vol, mom_20d, mom_60d, beta), (x, y) in zip(
+                    valid_tickers, labels.tolist(), stock_features, stock_pca):
                 stock_details.append({
                     'ticker': ticker,
-                    'cluster': int(labels[i]),
+                    'cluster': label,
                     'features': {
-                        'return': round(float(features[i, 0] * 100), 2),
-                        'volatility': round(float(features[i, 1] * 100), 2),
-                        'momentum_20d': round(float(features[i, 2] * 100), 2),
-                        'momentum_60d': round(float(features[i, 3] * 100), 2),
-                        'beta': round(float(features[i, 4]), 2)
+                        'return': ret,
+                        'volatility': vol,
+                        'momentum_20d': mom_20d,
+                        'momentum_60d': mom_60d,
+                        'beta': beta
                     },
-                    'pca': {
-                        'x': round(float(pca_coords[i, 0]), 4),
-                        'y': round(float(pca_coords[i, 1]), 4)
-                    }
+                    'pca': {'x': x, 'y': y}
                 })
 
             response = {
@@ -357,14 +396,8 @@ class handler(BaseHTTPRequestHandler):
                 "portfolios": portfolios,
                 "stocks": stock_details,
                 "centroids": {
-                    "features": [[round(float(c), 4) for c in centroid] for centroid in centroids],
-                    "pca": [
-                        {
-                            'x': round(float(pca_reduce(centroids, 2)[i, 0]), 4),
-                            'y': round(float(pca_reduce(centroids, 2)[i, 1]), 4)
-                        }
-                        for i in range(n_clusters)
-                    ]
+                    "features": np.round(centroids.astype(np.float64), 4),
+                    "pca": [{'x': x, 'y': y} for x, y in centroid_pca]
                 }
             }
 
@@ -372,14 +405,14 @@ class handler(BaseHTTPRequestHandler):
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.wfile.write(dumps(response))
 
         except Exception as e:
             self.send_response(500)
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.wfile.write(dumps({"error": str(e)}))
 
     def do_OPTIONS(self):
         self.send_response(200)
@@ -2,14 +2,20 @@
 Value at Risk (VaR) Calculator API
 """
 from http.server import BaseHTTPRequestHandler
+import gzip
+import heapq
 import json
+from functools import lru_cache
+import time
 from urllib.parse import parse_qs, urlparse
 import math
+import operator
 import random
 
 try:
     import numpy as np
     from scipy import stats
+    rng = np.random.default_rng()  # PCG64; faster than the legacy MT19937 global
     SCIPY_AVAILABLE = True
 except ImportError:
     SCIPY_AVAILABLE = False
@@ -22,14 +28,47 @@ except ImportError:
     YFINANCE_AVAILABLE = False
 
 
-def historical_var(returns, confidence_level):
-    """Calculate Historical VaR"""
-    if SCIPY_AVAILABLE:
-        return float(np.percentile(returns, (1 - confidence_level) * 100))
-    else:
-        sorted_returns = sorted(returns)
-        idx = int(len(sorted_returns) * (1 - confidence_level))
-        return sorted_returns[idx]
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj):
+    """Serialize NumPy arrays/scalars for the stdlib json fallback"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Encode a response body as JSON bytes (orjson handles NumPy natively)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+HISTORY_TTL_SECONDS = 300
+
+_SQRT_252 = math.sqrt(252)  # daily -> annual volatility
+
+# Lower-tail z-scores for the common confidence levels, computed once at import
+_Z_SCORES = {}
+if SCIPY_AVAILABLE:
+    _Z_SCORES = {q: float(stats.norm.ppf(1 - q)) for q in (0.90, 0.95, 0.975, 0.99, 0.995)}
+
+
+@lru_cache(maxsize=128)
+def _history_for_bucket(ticker, period, bucket):
+    """Download price history; bucket changes every HISTORY_TTL_SECONDS"""
+    return yf.Ticker(ticker).history(period=period)
+
+
+def fetch_history(ticker, period):
+    """Price history memoized per warm instance (callers must not mutate it)"""
+    return _history_for_bucket(ticker, period, int(time.time() // HISTORY_TTL_SECONDS))
 
 
 def parametric_var(returns, confidence_level):
@@ -37,7 +76,9 @@ def parametric_var(returns, confidence_level):
     if SCIPY_AVAILABLE:
         mean_return = np.mean(returns)
         std_return = np.std(returns)
-        z_score = stats.norm.ppf(1 - confidence_level)
+        z_score = _Z_SCORES.get(confidence_level)
+        if z_score is None:
+            z_score = stats.norm.ppf(1 - confidence_level)
         return float(mean_return + z_score * std_return)
     else:
         mean_return = sum(returns) / len(returns)
@@ -51,26 +92,145 @@ def parametric_var(returns, confidence_level):
 
 def monte_carlo_var(mean_return, std_return, confidence_level, n_simulations=10000):
     """Calculate Monte Carlo VaR"""
+    # Antithetic pairs (z, -z): half the draws for the same tail accuracy
+    half = n_simulations // 2
+    idx = int(2 * half * (1 - confidence_level))
     if SCIPY_AVAILABLE:
-        simulated_returns = np.random.normal(mean_return, std_return, n_simulations)
-        return float(np.percentile(simulated_returns, (1 - confidence_level) * 100))
+        return float(monte_carlo_var_batch([mean_return], [std_return], confidence_level, n_simulations)[0])
     else:
-        simulated_returns = [random.gauss(mean_return, std_return) for _ in range(n_simulations)]
-        sorted_sim = sorted(simulated_returns)
-        idx = int(n_simulations * (1 - confidence_level))
-        return sorted_sim[idx]
+        z = [random.gauss(0.0, 1.0) for _ in range(half)]
+        simulated_returns = [mean_return + std_return * x for x in z]
+        simulated_returns += [mean_return - std_return * x for x in z]
+        return heapq.nsmallest(idx + 1, simulated_returns)[-1]
+
+
+_SIMULATION_BUFFER = {}
+
+
+def _antithetic_normals(half):
+    """(2*half, 1) standard normals as (z, -z) pairs, reusing one buffer per size"""
+    z = _SIMULATION_BUFFER.get(half)
+    if z is None:
+        z = _SIMULATION_BUFFER[half] = np.empty((2 * half, 1), dtype=np.float32)
+    rng.standard_normal(dtype=np.float32, out=z[:half])
+    np.negative(z[:half], out=z[half:])
+    return z
+
 
+def monte_carlo_var_batch(means, stds, confidence_level, n_simulations=10000):
+    """Monte Carlo VaR for K (mean, std) pairs from one shared (n, K) draw"""
+    # float32 samples: a sampled quantile has far less precision than float32 carries
+    means = np.asarray(means, dtype=np.float32)
+    stds = np.asarray(stds, dtype=np.float32)
+    half = n_simulations // 2
+    idx = int(2 * half * (1 - confidence_level))
+    z = _antithetic_normals(half)
+    if means.size == 1:
+        # Single ticker: scale and select inside the reused buffer
+        z *= stds
+        z += means
+        z.partition(idx, axis=0)
+        return z[idx].astype(np.float64)
+    simulated_returns = z * stds + means
+    return np.partition(simulated_returns, idx, axis=0)[idx].astype(np.float64)
 
-def conditional_var(returns, confidence_level):
-    """Calculate Conditional VaR (Expected Shortfall)"""
-    var = historical_var(returns, confidence_level)
+
+def historical_var_cvar(returns, confidence_level):
+    """Historical VaR and CVaR together, selecting the quantile in O(n)"""
     if SCIPY_AVAILABLE:
-        returns_arr = np.array(returns)
-        tail_losses = returns_arr[returns_arr <= var]
-        return float(np.mean(tail_losses)) if len(tail_losses) > 0 else var
+        returns_arr = np.asarray(returns, dtype=float)
+        # np.percentile's linear method step for step (including its q / 100
+        # and two-sided lerp), so the boundary return lands on the same side
+        # of the tail mask; partition replaces the sort
+        n = len(returns_arr)
+        h = (n - 1) * ((1 - confidence_level) * 100 / 100)
+        lo = min(int(h), n - 1)
+        hi = min(lo + 1, n - 1)
+        t = h - lo
+        part = np.partition(returns_arr, [lo, hi])
+        d = part[hi] - part[lo]
+        var = float(part[hi] - d * (1 - t) if t >= 0.5 else part[lo] + d * t)
+        tail_losses = part[part <= var]
+        return var, float(np.mean(tail_losses)) if len(tail_losses) > 0 else var
     else:
-        tail_losses = [r for r in returns if r <= var]
-        return sum(tail_losses) / len(tail_losses) if tail_losses else var
+        # Only the k+1 smallest are needed: O(n log k) instead of a full sort
+        idx = int(len(returns) * (1 - confidence_level))
+        smallest = heapq.nsmallest(idx + 1, returns)
+        var = smallest[-1]
+        # Reuse the k+1 smallest as the tail, adding any unselected ties at the VaR
+        ties = operator.countOf(returns, var) - smallest.count(var)
+        tail_losses = smallest + [var] * ties
+        return var, sum(tail_losses) / len(tail_losses) if tail_losses else var
+
+
+def return_moments(returns):
+    """Mean and population standard deviation of daily returns"""
+    if SCIPY_AVAILABLE:
+        return float(np.mean(returns)), float(np.std(returns))
+    mean_return = sum(returns) / len(returns)
+    variance = sum((r - mean_return)**2 for r in returns) / len(returns)
+    return mean_return, math.sqrt(variance)
+
+
+@lru_cache(maxsize=128)
+def _returns_for_bucket(ticker, period, bucket):
+    """Returns and moments from fetched history; bucket changes every HISTORY_TTL_SECONDS"""
+    df = fetch_history(ticker, period)
+
+    if df.empty:
+        raise ValueError(f"No data found for {ticker}")
+
+    closes = df["Close"].to_numpy(dtype=float)
+    closes = closes[~np.isnan(closes)]
+    returns = np.diff(closes) / closes[:-1]
+    returns.flags.writeable = False  # shared by every warm request; handlers read it in place
+    return (returns, *return_moments(returns))
+
+
+def load_returns(ticker, period):
+    """Daily returns with mean and std, memoized per warm instance (callers must not mutate them)"""
+    if YFINANCE_AVAILABLE:
+        return _returns_for_bucket(ticker, period, int(time.time() // HISTORY_TTL_SECONDS))
+
+    # Generate sample returns if yfinance not available
+    returns = [random.gauss(0.0005, 0.02) for _ in range(252)]
+    if SCIPY_AVAILABLE:
+        returns = np.array(returns)
+    return (returns, *return_moments(returns))
+
+
+def var_report(ticker, returns, mean_return, std_return, mc_var, confidence_level, portfolio_value, period):
+    """Assemble the VaR response for one ticker"""
+    hist_var, cvar = historical_var_cvar(returns, confidence_level)
+    param_var = parametric_var(returns, confidence_level)
+
+    return {
+        "ticker": ticker,
+        "confidence_level": confidence_level,
+        "portfolio_value": portfolio_value,
+        "period": period,
+        "data_points": len(returns),
+        "statistics": {
+            "mean_daily_return": round(mean_return, 6),
+            "std_daily_return": round(std_return, 6),
+            "annualized_return": round(mean_return * 252 * 100, 2),
+            "annualized_volatility": round(std_return * _SQRT_252 * 100, 2),
+        },
+        "var_percentages": {
+            "historical": round(hist_var * 100, 4),
+            "parametric": round(param_var * 100, 4),
+            "monte_carlo": round(mc_var * 100, 4),
+            "cvar": round(cvar * 100, 4),
+        },
+        "var_dollar": {
+            "historical": round(abs(hist_var) * portfolio_value, 2),
+            "parametric": round(abs(param_var) * portfolio_value, 2),
+            "monte_carlo": round(abs(mc_var) * portfolio_value, 2),
+            "cvar": round(abs(cvar) * portfolio_value, 2),
+        },
+        "returns_histogram": (np.round(returns[:252] * 100, 4) if SCIPY_AVAILABLE
+                              else [round(r * 100, 4) for r in returns[:252]]),
+    }
 
 
 class handler(BaseHTTPRequestHandler):
@@ -84,69 +244,70 @@ class handler(BaseHTTPRequestHandler):
             portfolio_value = float(params.get("portfolio_value", [1000000])[0])
             period = params.get("period", ["1y"])[0]
 
-            if YFINANCE_AVAILABLE:
-                stock = yf.Ticker(ticker)
-                df = stock.history(period=period)
+            # ?tickers=AAPL,MSFT,GOOG shares one Monte Carlo draw across all tickers
+            tickers = params.get("tickers", [""])[0]
+            names = [t.strip().upper() for t in tickers.split(",") if t.strip()] or [ticker]
 
-                if df.empty:
-                    raise ValueError(f"No data found for {ticker}")
+            loaded = [load_returns(name, period) for name in names]
 
-                returns = df["Close"].pct_change().dropna().values
+            if SCIPY_AVAILABLE:
+                mc_vars = monte_carlo_var_batch([m for _, m, _ in loaded], [sd for _, _, sd in loaded],
+                                                confidence_level).tolist()
             else:
-                # Generate sample returns if yfinance not available
-                returns = [random.gauss(0.0005, 0.02) for _ in range(252)]
+                mc_vars = [monte_carlo_var(m, sd, confidence_level) for _, m, sd in loaded]
 
-            if SCIPY_AVAILABLE:
-                returns = np.array(returns)
-                mean_return = float(np.mean(returns))
-                std_return = float(np.std(returns))
+            reports = [
+                var_report(name, returns, mean_return, std_return, mc_var,
+                           confidence_level, portfolio_value, period)
+                for name, (returns, mean_return, std_return), mc_var in zip(names, loaded, mc_vars)
+            ]
+
+            if tickers:
+                result = {
+                    "confidence_level": confidence_level,
+                    "portfolio_value": portfolio_value,
+                    "period": period,
+                    "results": reports,
+                }
             else:
-                mean_return = sum(returns) / len(returns)
-                variance = sum((r - mean_return)**2 for r in returns) / len(returns)
-                std_return = math.sqrt(variance)
-
-            # Calculate VaR using different methods
-            hist_var = historical_var(returns, confidence_level)
-            param_var = parametric_var(returns, confidence_level)
-            mc_var = monte_carlo_var(mean_return, std_return, confidence_level)
-            cvar = conditional_var(list(returns) if SCIPY_AVAILABLE else returns, confidence_level)
-
-            result = {
-                "ticker": ticker,
-                "confidence_level": confidence_level,
-                "portfolio_value": portfolio_value,
-                "period": period,
-                "data_points": len(returns),
-                "statistics": {
-                    "mean_daily_return": round(mean_return, 6),
-                    "std_daily_return": round(std_return, 6),
-                    "annualized_return": round(mean_return * 252 * 100, 2),
-                    "annualized_volatility": round(std_return * math.sqrt(252) * 100, 2),
-                },
-                "var_percentages": {
-                    "historical": round(hist_var * 100, 4),
-                    "parametric": round(param_var * 100, 4),
-                    "monte_carlo": round(mc_var * 100, 4),
-                    "cvar": round(cvar * 100, 4),
-                },
-                "var_dollar": {
-                    "historical": round(abs(hist_var) * portfolio_value, 2),
-                    "parametric": round(abs(param_var) * portfolio_value, 2),
-                    "monte_carlo": round(abs(mc_var) * portfolio_value, 2),
-                    "cvar": round(abs(cvar) * portfolio_value, 2),
-                },
-                "returns_histogram": [round(r * 100, 4) for r in list(returns)[:252]],
-            }
+                result = reports[0]
 
+            body = dumps(result)
+            gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+            if gzipped:
+                # Level 1 already halves these float-heavy payloads at minimal CPU cost
+                body = gzip.compress(body, compresslevel=1)
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Content-Length", str(len(body)))
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps(result).encode())
+            self.wfile.write(body)
 
         except Exception as e:
+            body = dumps({"error": str(e)})
             self.send_response(500)
             self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        # CORS preflight: answer from headers alone and let browsers cache it for a day
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Max-Age", "86400")
+        self.end_headers()
+
+    def do_HEAD(self):
+        # Headers only; skip the fetch and the model work a GET would do
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
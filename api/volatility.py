@@ -2,7 +2,10 @@
 Volatility Modeling API - EWMA and basic volatility calculations
 """
 from http.server import BaseHTTPRequestHandler
+import gzip
 import json
+from functools import lru_cache
+import time
 from urllib.parse import parse_qs, urlparse
 import math
 
@@ -12,6 +15,12 @@ try:
 except ImportError:
     NUMPY_AVAILABLE = False
 
+try:
+    from scipy.signal import lfilter
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
 try:
     import yfinance as yf
     import pandas as pd
@@ -20,6 +29,44 @@ except ImportError:
     YFINANCE_AVAILABLE = False
 
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj):
+    """Serialize NumPy arrays/scalars for the stdlib json fallback"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Encode a response body as JSON bytes (orjson handles NumPy natively)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+HISTORY_TTL_SECONDS = 300
+
+_SQRT_252 = math.sqrt(252)  # daily -> annual volatility
+
+
+@lru_cache(maxsize=128)
+def _history_for_bucket(ticker, period, bucket):
+    """Download price history; bucket changes every HISTORY_TTL_SECONDS"""
+    return yf.Ticker(ticker).history(period=period)
+
+
+def fetch_history(ticker, period):
+    """Price history memoized per warm instance (callers must not mutate it)"""
+    return _history_for_bucket(ticker, period, int(time.time() // HISTORY_TTL_SECONDS))
+
+
 def calculate_ewma_volatility(returns, lambda_param=0.94):
     """
     Calculate EWMA (Exponentially Weighted Moving Average) volatility
@@ -29,15 +76,20 @@ def calculate_ewma_volatility(returns, lambda_param=0.94):
     n = len(returns)
 
     if NUMPY_AVAILABLE:
-        returns = np.array(returns)
+        returns = np.asarray(returns, dtype=float)
         variance = np.zeros(n)
         variance[0] = returns[0] ** 2
 
-        for t in range(1, n):
-            variance[t] = lambda_param * variance[t-1] + (1 - lambda_param) * returns[t-1] ** 2
+        if SCIPY_AVAILABLE:
+            # The recursion is a first-order IIR filter over r^2, run in C
+            variance[1:] = lfilter([1 - lambda_param], [1, -lambda_param], returns[:-1] ** 2,
+                                   zi=[lambda_param * variance[0]])[0]
+        else:
+            for t in range(1, n):
+                variance[t] = lambda_param * variance[t-1] + (1 - lambda_param) * returns[t-1] ** 2
 
-        volatility = np.sqrt(variance) * np.sqrt(252)  # Annualized
-        return volatility.tolist()
+        volatility = np.sqrt(variance) * _SQRT_252  # Annualized
+        return volatility
     else:
         variance = [returns[0] ** 2]
 
@@ -45,13 +97,28 @@ def calculate_ewma_volatility(returns, lambda_param=0.94):
             v = lambda_param * variance[-1] + (1 - lambda_param) * returns[t-1] ** 2
             variance.append(v)
 
-        volatility = [math.sqrt(v) * math.sqrt(252) for v in variance]
+        volatility = [math.sqrt(v) * _SQRT_252 for v in variance]
         return volatility
 
 
 def calculate_rolling_volatility(returns, window=20):
     """Calculate rolling standard deviation volatility"""
     n = len(returns)
+
+    if NUMPY_AVAILABLE:
+        # O(n) window moments from prefix sums, taken about the series mean
+        # so E[r^2] - E[r]^2 does not cancel catastrophically
+        r = np.asarray(returns, dtype=float)
+        r = r - r.mean()
+        c1 = np.concatenate(([0.0], np.cumsum(r)))
+        c2 = np.concatenate(([0.0], np.cumsum(r * r)))
+        hi = np.arange(1, n + 1)
+        lo = np.maximum(hi - window, 0)
+        count = hi - lo
+        mean = (c1[hi] - c1[lo]) / count
+        var = np.maximum((c2[hi] - c2[lo]) / count - mean ** 2, 0.0)
+        return np.sqrt(var) * _SQRT_252
+
     volatility = []
 
     for i in range(n):
@@ -61,12 +128,9 @@ def calculate_rolling_volatility(returns, window=20):
         else:
             subset = returns[i-window+1:i+1]
 
-        if NUMPY_AVAILABLE:
-            vol = float(np.std(subset)) * np.sqrt(252)
-        else:
-            mean = sum(subset) / len(subset)
-            var = sum((r - mean)**2 for r in subset) / len(subset)
-            vol = math.sqrt(var) * math.sqrt(252)
+        mean = sum(subset) / len(subset)
+        var = sum((r - mean)**2 for r in subset) / len(subset)
+        vol = math.sqrt(var) * _SQRT_252
 
         volatility.append(vol)
 
@@ -75,17 +139,68 @@ def calculate_rolling_volatility(returns, window=20):
 
 def forecast_ewma_volatility(last_variance, last_return, lambda_param, horizon):
     """Forecast future volatility using EWMA"""
+    if NUMPY_AVAILABLE:
+        # Closed form of the recursion: var_h = lambda^h * var_0 + (1 - lambda^h) * r^2
+        decay = lambda_param ** np.arange(1, horizon + 1)
+        variance = decay * last_variance + (1 - decay) * last_return ** 2
+        return np.sqrt(variance) * _SQRT_252
+
     forecasts = []
     variance = last_variance
 
     for h in range(1, horizon + 1):
         # EWMA forecast (converges to long-term variance)
         variance = lambda_param * variance + (1 - lambda_param) * last_return ** 2
-        forecasts.append(math.sqrt(variance) * math.sqrt(252))
+        forecasts.append(math.sqrt(variance) * _SQRT_252)
 
     return forecasts
 
 
+def to_percent(values, decimals=2):
+    """Scale a volatility series to percent and round it"""
+    if NUMPY_AVAILABLE:
+        return np.round(np.asarray(values) * 100, decimals)
+    return [round(v * 100, decimals) for v in values]
+
+
+def return_moments(returns):
+    """Mean daily return and annualized realized volatility"""
+    if NUMPY_AVAILABLE:
+        return float(np.mean(returns)), float(np.std(returns)) * _SQRT_252
+    mean_return = sum(returns) / len(returns)
+    variance = sum((r - mean_return)**2 for r in returns) / len(returns)
+    return mean_return, math.sqrt(variance) * _SQRT_252
+
+
+@lru_cache(maxsize=128)
+def _returns_for_bucket(ticker, period, bucket):
+    """Returns, dates and moments from fetched history; bucket changes every HISTORY_TTL_SECONDS"""
+    df = fetch_history(ticker, period)
+
+    if df.empty:
+        raise ValueError(f"No data found for {ticker}")
+
+    closes = df["Close"].to_numpy(dtype=float)
+    closes = closes[~np.isnan(closes)]
+    returns = np.diff(closes) / closes[:-1]
+    returns.flags.writeable = False  # shared by every warm request; handlers read it in place
+    # Vectorized day formatting of the local wall-clock dates (strftime runs per element)
+    dates = np.datetime_as_string(df.index[1:].tz_localize(None).values, unit="D").tolist()
+    return (returns, dates, *return_moments(returns))
+
+
+def load_returns(ticker, period):
+    """Returns, dates, mean and realized vol, memoized per warm instance (callers must not mutate them)"""
+    if YFINANCE_AVAILABLE:
+        return _returns_for_bucket(ticker, period, int(time.time() // HISTORY_TTL_SECONDS))
+
+    # Generate sample data
+    import random
+    returns = [random.gauss(0, 0.02) for _ in range(252)]
+    dates = [f"2024-{(i//22)+1:02d}-{(i%22)+1:02d}" for i in range(len(returns))]
+    return (returns, dates, *return_moments(returns))
+
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         parsed = urlparse(self.path)
@@ -97,36 +212,14 @@ class handler(BaseHTTPRequestHandler):
             period = params.get("period", ["1y"])[0]
             forecast_horizon = int(params.get("forecast_horizon", [5])[0])
 
-            if YFINANCE_AVAILABLE:
-                stock = yf.Ticker(ticker)
-                df = stock.history(period=period)
-
-                if df.empty:
-                    raise ValueError(f"No data found for {ticker}")
-
-                returns = df["Close"].pct_change().dropna().values.tolist()
-                dates = df.index[1:].strftime("%Y-%m-%d").tolist()
-            else:
-                # Generate sample data
-                import random
-                returns = [random.gauss(0, 0.02) for _ in range(252)]
-                dates = [f"2024-{(i//22)+1:02d}-{(i%22)+1:02d}" for i in range(len(returns))]
+            returns, dates, mean_return, realized_vol = load_returns(ticker, period)
 
             # Calculate volatilities
             ewma_vol = calculate_ewma_volatility(returns, lambda_param)
             rolling_vol = calculate_rolling_volatility(returns, window=20)
 
-            # Calculate realized volatility (actual std of returns)
-            if NUMPY_AVAILABLE:
-                realized_vol = float(np.std(returns)) * np.sqrt(252)
-                mean_return = float(np.mean(returns))
-            else:
-                mean_return = sum(returns) / len(returns)
-                variance = sum((r - mean_return)**2 for r in returns) / len(returns)
-                realized_vol = math.sqrt(variance) * math.sqrt(252)
-
             # Forecast
-            last_variance = (ewma_vol[-1] / math.sqrt(252)) ** 2
+            last_variance = (ewma_vol[-1] / _SQRT_252) ** 2
             last_return = returns[-1]
             forecast = forecast_ewma_volatility(last_variance, last_return, lambda_param, forecast_horizon)
 
@@ -143,24 +236,51 @@ class handler(BaseHTTPRequestHandler):
                 },
                 "time_series": {
                     "dates": dates[-100:],  # Last 100 data points
-                    "ewma": [round(v * 100, 2) for v in ewma_vol[-100:]],
-                    "rolling_20d": [round(v * 100, 2) for v in rolling_vol[-100:]],
+                    "ewma": to_percent(ewma_vol[-100:]),
+                    "rolling_20d": to_percent(rolling_vol[-100:]),
                 },
                 "forecast": {
                     "horizon": forecast_horizon,
-                    "ewma_forecast": [round(v * 100, 2) for v in forecast],
+                    "ewma_forecast": to_percent(forecast),
                 },
             }
 
+            body = dumps(result)
+            gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+            if gzipped:
+                # Level 1 already halves these float-heavy payloads at minimal CPU cost
+                body = gzip.compress(body, compresslevel=1)
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Content-Length", str(len(body)))
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps(result).encode())
+            self.wfile.write(body)
 
         except Exception as e:
+            body = dumps({"error": str(e)})
             self.send_response(500)
             self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        # CORS preflight: answer from headers alone and let browsers cache it for a day
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Max-Age", "86400")
+        self.end_headers()
+
+    def do_HEAD(self):
+        # Headers only; skip the fetch and the model work a GET would do
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()